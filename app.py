@@ -1,24 +1,153 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, current_app
+from flask import Flask, render_template, request, redirect, url_for, flash, session, current_app, g, jsonify, Response, abort, send_from_directory, stream_with_context
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.local import LocalProxy
+import sqlalchemy as sa
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import asyncio
+import click
+import contextlib
+import hashlib
+import heapq
+import io
+import itertools
+import json
 import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from change_feed import Broadcaster, format_message, parse_after, HEARTBEAT, RETRY, serve as serve_change_feed
+from data_io import FORMATS, detect_format, read_rows, write_rows
+import image_store
+from instrumentation import Instrumentation
+from interval_index import ResourceIntervalIndex, find_free_slots, occupancy_bits
+from recurrence import Series
+from response_cache import LRUCache, SQLiteCache
+from session_store import FileSessionStore, ServerSideSessionInterface, SQLiteSessionStore
+from throttling import BoundedExecutor, ExecutorBusy, RateLimiter, RetriesExhausted, retry
 
 app = Flask(__name__, instance_relative_config=True)
 
 app.config.from_mapping(
     SECRET_KEY='a_new_strong_secret_key_for_sessions',
+    # Session data is kept server-side and the cookie only carries a signed session id
+    SESSION_BACKEND='sqlite', # 'sqlite' (one file) or 'file' (one file per session)
+    SESSION_STORE_PATH=None, # Defaults to instance/sessions.db, or the instance/sessions directory for 'file'
     SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(app.instance_path, 'events.db'),
     SQLALCHEMY_TRACK_MODIFICATIONS=False,
-    UPLOAD_FOLDER='static/profile_pics' # New upload folder configuration
+    UPLOAD_FOLDER='static/profile_pics', # New upload folder configuration
+    PROFILE_PIC_MAX_BYTES=5 * 1024 * 1024,
+    # Thumbnail label -> longest side in pixels (twice the displayed size, for high-DPI screens); needs Pillow
+    PROFILE_PIC_SIZES={'small': 48, 'medium': 300},
+    THUMBNAIL_WORKERS=2,
+    EVENTS_PAGE_SIZE=25,
+    EVENTS_MAX_PAGE_SIZE=100,
+    PICKER_PAGE_SIZE=20, # Options shown at once in the event/resource pickers
+    ALLOCATIONS_PAGE_SIZE=50,
+    BULK_ALLOCATION_MAX_ITEMS=5000,
+    SLOT_SEARCH_DEFAULT_DAYS=30,
+    SLOT_SEARCH_MAX_DAYS=400,
+    AVAILABILITY_DEFAULT_DAYS=7,
+    AVAILABILITY_MAX_CELLS=1500000, # Resources x buckets per matrix, e.g. 500 resources x 31 days of 15 minutes
+    AVAILABILITY_GRID_MAX_CELLS=100000, # Lower for the HTML grid, which renders every cell
+    RESPONSE_CACHE_ENABLED=True,
+    RESPONSE_CACHE_TTL=60, # Seconds; also bounds how stale time-dependent parts (upcoming bookings) can get
+    RESPONSE_CACHE_MAX_ENTRIES=512,
+    RESPONSE_CACHE_BACKEND='memory', # 'memory' (per process) or 'sqlite' (shared by all workers)
+    RESPONSE_CACHE_PATH=None, # SQLite backend file; defaults to instance/response_cache.db
+    # Full werkzeug method string; when it changes, passwords are rehashed at their owner's next login
+    PASSWORD_HASH_METHOD='scrypt:32768:8:1',
+    PASSWORD_HASH_WORKERS=2, # Hashes computed at once, so a login burst can't take every core
+    PASSWORD_HASH_MAX_PENDING=16, # Logins beyond this many waiting get a 503 instead of queueing
+    LOGIN_RATE_LIMIT_PER_USERNAME=10, # Attempts per LOGIN_RATE_LIMIT_WINDOW seconds
+    LOGIN_RATE_LIMIT_PER_IP=30,
+    LOGIN_RATE_LIMIT_WINDOW=60,
+    # Open-ended recurring events are expanded this many days ahead for conflict checks and all-time reports
+    RECURRENCE_HORIZON_DAYS=365,
+    # Attempts to get SQLite's write lock for a booking, each waiting up to the busy timeout, with
+    # jittered backoff starting at WRITE_RETRY_BASE_SECONDS between them
+    WRITE_RETRY_ATTEMPTS=5,
+    WRITE_RETRY_BASE_SECONDS=0.05,
+    CHANGE_FEED_RETENTION=10000, # Changes kept for clients catching up with Last-Event-ID
+    CHANGE_FEED_POLL_SECONDS=0.5,
+    CHANGE_FEED_HEARTBEAT_SECONDS=15,
+    # /changes holds a worker thread per client, so streams end after this long and the browser reconnects
+    CHANGE_FEED_STREAM_SECONDS=300,
+    CHANGE_FEED_WSGI_STREAM=False, # Serve /changes from the app itself; off by default as each stream ties up a worker
+    CHANGE_FEED_URL=None, # Where pages subscribe; set to the "flask feed serve" address to use it instead of /changes
+    CHANGE_FEED_ALLOWED_ORIGIN=None # Origin of the pages (e.g. http://localhost:5000) allowed to read "flask feed serve"
 )
+# Allow overrides such as FLASK_SQLALCHEMY_DATABASE_URI (used by the benchmarks)
+app.config.from_prefixed_env()
+
+# Database profiles, selected with DATABASE_PROFILE (e.g. FLASK_DATABASE_PROFILE=production).
+# Settings given explicitly in the config take precedence over the profile.
+DATABASE_PROFILES = {
+    'default': {},
+    'production': {
+        # Applied to every new SQLite connection
+        'SQLITE_PRAGMAS': {
+            'journal_mode': 'WAL', # Readers no longer block the writer and vice versa
+            'synchronous': 'NORMAL', # Safe with WAL; fsync at checkpoints instead of every commit
+            'busy_timeout': 10000, # ms to wait for the write lock before "database is locked"
+            'mmap_size': 268435456, # 256 MB memory-mapped reads
+            'cache_size': -65536, # 64 MB page cache per connection
+            'temp_store': 'MEMORY'
+        },
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'connect_args': {'timeout': 10}
+        }
+    }
+}
+for key, value in DATABASE_PROFILES[app.config.get('DATABASE_PROFILE', 'default')].items():
+    app.config.setdefault(key, value)
 
 # Ensure required directories exist (instance for SQLite, upload folder for profile pics)
 os.makedirs(app.instance_path, exist_ok=True)
 os.makedirs(os.path.join(app.root_path, app.config['UPLOAD_FOLDER']), exist_ok=True)
 
+if app.config['SESSION_BACKEND'] == 'file':
+    session_store = FileSessionStore(app.config['SESSION_STORE_PATH'] or os.path.join(app.instance_path, 'sessions'))
+else:
+    session_store = SQLiteSessionStore(app.config['SESSION_STORE_PATH'] or os.path.join(app.instance_path, 'sessions.db'))
+app.session_interface = ServerSideSessionInterface(session_store)
+
 db = SQLAlchemy(app)
+# Opt-in request timing, SQL/template counters and /metrics (FLASK_INSTRUMENTATION_ENABLED=true);
+# FLASK_PROFILER_ENABLED=true samples slow requests to PROFILER_ENDPOINTS into flamegraph stacks
+instrumentation = Instrumentation(app)
+
+@sa.event.listens_for(sa.engine.Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+# Parameters werkzeug fills in when a method string leaves them out
+HASH_METHOD_DEFAULTS = {'scrypt': (2 ** 15, 8, 1), 'pbkdf2': ('sha256', DEFAULT_PBKDF2_ITERATIONS)}
+
+def hash_method_params(method):
+    """
+    A werkzeug method string such as 'scrypt:32768:8:1' or 'pbkdf2:sha256' as (name, parameters),
+    with defaults filled in and numbers compared as numbers, so equivalent spellings are equal.
+    """
+    name, *params = method.split(':')
+    params = [int(param) if param.isdigit() else param for param in params]
+    defaults = HASH_METHOD_DEFAULTS.get(name, ())
+    return name, tuple(params) + tuple(defaults[len(params):])
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -26,11 +155,17 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     profile_pic = db.Column(db.String(120), nullable=True, default='default_profile_pic.png') # New profile picture column
 
+    # Hashing is deliberately slow, so it runs on the bounded hashing pool; both raise ExecutorBusy when it is full
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_executor().run(
+            generate_password_hash, password, method=app.config['PASSWORD_HASH_METHOD']
+        )
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_password_executor().run(check_password_hash, self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hash_method_params(self.password_hash.split('$', 1)[0]) != hash_method_params(app.config['PASSWORD_HASH_METHOD'])
 
     def __repr__(self):
         return f"<User {self.username}>"
@@ -38,17 +173,45 @@ class User(db.Model):
 
 class Event(db.Model):
     event_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     user = db.relationship('User', backref='events', lazy=True)
     title = db.Column(db.String(100), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
-    end_time = db.Column(db.DateTime, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
+    end_time = db.Column(db.DateTime, nullable=False, index=True)
     description = db.Column(db.String(500), nullable=True)
+    # Recurring events store their first occurrence in start_time/end_time plus an RRULE-style rule;
+    # series_end is the end of the last occurrence (NULL if the series never ends)
+    recurrence = db.Column(db.String(200), nullable=True)
+    series_end = db.Column(db.DateTime, nullable=True, index=True)
     allocations = db.relationship('EventResourceAllocation', backref='event', lazy=True)
 
+    @property
+    def series(self):
+        return Series(self.recurrence, self.start_time, self.end_time) if self.recurrence else None
+
+    def set_recurrence(self, rule):
+        """Sets or (with an empty rule) clears the recurrence. Call after setting the times; raises ValueError."""
+        if not rule or not rule.strip():
+            self.recurrence = self.series_end = None
+            return
+        series = Series(rule, self.start_time, self.end_time)
+        self.recurrence = str(series.rule)
+        self.series_end = series.last_end
+
     def __repr__(self):
         return f"<Event {self.title}>"
 
+class EventOccurrence:
+    """One occurrence of a recurring event; everything but the times comes from the event."""
+
+    def __init__(self, event, start_time, end_time):
+        self.event = event
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
 class Resource(db.Model):
     resource_id = db.Column(db.Integer, primary_key=True)
     resource_name = db.Column(db.String(100), nullable=False, unique=True)
@@ -60,29 +223,389 @@ class Resource(db.Model):
 
 class EventResourceAllocation(db.Model):
     allocation_id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey('event.event_id'), nullable=False)
-    resource_id = db.Column(db.Integer, db.ForeignKey('resource.resource_id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.event_id'), nullable=False, index=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.resource_id'), nullable=False, index=True)
+
+    __table_args__ = (
+        # A resource is allocated to an event at most once, even when two requests race
+        db.Index('ix_allocation_event_resource', 'event_id', 'resource_id', unique=True),
+    )
 
     def __repr__(self):
         return f"<Allocation {self.allocation_id}: Event {self.event_id} - Resource {self.resource_id}>"
 
-# Context processor to make User model available in all templates
+class ResourceDailyUsage(db.Model):
+    # Rollup of one-off booked hours per resource per calendar day, maintained on every flush.
+    # Recurring events are expanded at report time instead.
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.resource_id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    hours = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResourceDailyUsage {self.resource_id} {self.day}: {self.hours}h>"
+
+class DataVersion(db.Model):
+    # Single row counting committed data changes; part of every cached page's key
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class Change(db.Model):
+    # Append-only log of data changes, streamed to clients by the change feed
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(40), nullable=False) # e.g. 'allocation.created'
+    payload = db.Column(db.Text, nullable=False) # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+def get_password_executor():
+    executor = app.extensions.get('password_executor')
+    if executor is None:
+        executor = BoundedExecutor(app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_MAX_PENDING'])
+        app.extensions['password_executor'] = executor
+    return executor
+
+def get_thumbnail_executor():
+    executor = app.extensions.get('thumbnail_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=app.config['THUMBNAIL_WORKERS'], thread_name_prefix='thumbnails')
+        app.extensions['thumbnail_executor'] = executor
+    return executor
+
+def get_current_user():
+    """The logged-in User, or None. Loaded at most once per request."""
+    if 'user_id' not in session:
+        return None
+    if '_current_user' not in g:
+        g._current_user = db.session.get(User, session['user_id'])
+    return g._current_user
+
+# Only looked up when a template actually uses it
+current_user = LocalProxy(get_current_user)
+
+# Context processor to make the logged-in user available in all templates
 @app.context_processor
 def inject_user():
-    return dict(User=User)
+    return dict(current_user=current_user)
+
+# In-memory interval index over allocations, used for conflict checks and free slots.
+# Each worker process keeps its own copy current by replaying the change log (see
+# record_session_changes), which every write appends to in its own transaction, so
+# changes made by other processes are picked up as well as this one's.
+resource_index = ResourceIntervalIndex()
+resource_index_lock = threading.Lock() # One thread replays at a time, so changes apply in order
+
+def load_resource_index():
+    # Read the log position first: changes committed during the load are replayed over it, which is harmless
+    resource_index.change_id = latest_change_id()
+    resource_index.load(
+        ((event_id, start, end, Series(recurrence, start, end) if recurrence else None)
+         for event_id, start, end, recurrence in db.session.query(Event.event_id, Event.start_time, Event.end_time, Event.recurrence)),
+        db.session.query(EventResourceAllocation.event_id, EventResourceAllocation.resource_id).all()
+    )
 
-def check_resource_conflict(resource_id, new_start_time, new_end_time, event_id=None):
+def apply_index_change(name, payload):
+    """Applies one change log entry to the index. Returns False when only a reload can apply it (bulk imports)."""
+    if name in ('event.created', 'event.updated'):
+        start, end = datetime.fromisoformat(payload['start_time']), datetime.fromisoformat(payload['end_time'])
+        resource_index.set_event(payload['event_id'], start, end,
+                                 Series(payload['recurrence'], start, end) if payload['recurrence'] else None)
+    elif name == 'event.deleted':
+        resource_index.remove_event(payload['event_id'])
+    elif name == 'allocation.created':
+        resource_index.add_allocation(payload['event_id'], payload['resource_id'])
+    elif name == 'allocation.deleted':
+        resource_index.remove_allocation(payload['event_id'], payload['resource_id'])
+    elif name == 'data.imported' and payload['kind'] == 'resources':
+        pass # New resources have no bookings yet
+    elif not name.startswith('resource.'):
+        return False
+    return True
+
+def apply_own_bulk_change(change_id, event_spans=(), allocations=()):
+    """
+    Applies rows this process bulk-inserted to the index after their commit. The log records them
+    only as data.imported (change_id), which would otherwise cost a reload. Valid when the write
+    ran under begin_immediate(), which left the index current up to the entry before change_id.
+    """
+    with resource_index_lock:
+        if not resource_index.loaded or resource_index.change_id != change_id - 1:
+            return # Another change came first; the next sync reloads instead
+        for event_id, start, end, series in event_spans:
+            resource_index.set_event(event_id, start, end, series)
+        for event_id, resource_id in allocations:
+            resource_index.add_allocation(event_id, resource_id)
+        resource_index.change_id = change_id
+
+def sync_resource_index():
+    """
+    Brings the index up to date with the committed data. Only call it while the session has
+    written nothing it hasn't committed, or the index could take in changes that are then rolled
+    back; begin_immediate() calls it as the write lock is taken, which makes it exact until commit.
+    """
+    with resource_index_lock, db.session.no_autoflush:
+        while True:
+            if not resource_index.loaded:
+                load_resource_index()
+            changes = fetch_changes(resource_index.change_id)
+            if not changes:
+                return
+            # Change ids have no gaps, so a jump means entries were trimmed before this process saw them
+            if changes[0][0] != resource_index.change_id + 1:
+                resource_index.loaded = False
+                continue
+            for change_id, name, payload in changes:
+                if not apply_index_change(name, json.loads(payload)):
+                    resource_index.loaded = False
+                    break
+                resource_index.change_id = change_id
+
+def get_resource_index():
+    """
+    The interval index, first brought up to date unless this session is in the middle of a write.
+    Inside a write transaction, call it before the first write, which may be the first time it loads.
+    """
+    dbapi_connection = db.session.connection().connection.dbapi_connection
+    if not resource_index.loaded:
+        sync_resource_index()
+    elif not dbapi_connection.in_transaction:
+        # Checked on the raw connection: this runs before every conflict check and slot search
+        latest, = dbapi_connection.execute(f'SELECT MAX(id) FROM {Change.__tablename__}').fetchone()
+        if (latest or 0) != resource_index.change_id:
+            sync_resource_index()
+    return resource_index
+
+# Daily utilization rollup maintenance
+
+def split_hours_by_day(start, end):
+    """Yields (day, hours) for every calendar day the interval [start, end) touches."""
+    day_start = datetime.combine(start.date(), datetime.min.time())
+    while day_start < end:
+        next_day = day_start + timedelta(days=1)
+        hours = (min(end, next_day) - max(start, day_start)).total_seconds() / 3600
+        if hours > 0:
+            yield day_start.date(), hours
+        day_start = next_day
+
+def contiguous_runs(days):
+    """Groups a set of dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in sorted(days):
+        if runs and day - runs[-1][1] <= timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+def recompute_daily_usage(connection, resource_id, first_day, last_day):
+    """Recomputes the rollup rows of one resource for [first_day, last_day] from the raw bookings."""
+    window_start = datetime.combine(first_day, datetime.min.time())
+    window_end = datetime.combine(last_day, datetime.min.time()) + timedelta(days=1)
+    bookings = connection.execute(
+        sa.select(Event.start_time, Event.end_time).join_from(EventResourceAllocation, Event).where(
+            EventResourceAllocation.resource_id == resource_id,
+            Event.recurrence.is_(None),
+            Event.end_time > window_start,
+            Event.start_time < window_end
+        )
+    )
+    totals = {}
+    for start_time, end_time in bookings:
+        for day, hours in split_hours_by_day(max(start_time, window_start), min(end_time, window_end)):
+            totals[day] = totals.get(day, 0) + hours
+
+    connection.execute(sa.delete(ResourceDailyUsage).where(
+        ResourceDailyUsage.resource_id == resource_id,
+        ResourceDailyUsage.day.between(first_day, last_day)
+    ))
+    if totals:
+        connection.execute(sa.insert(ResourceDailyUsage), [
+            {'resource_id': resource_id, 'day': day, 'hours': hours} for day, hours in totals.items()
+        ])
+
+@sa.event.listens_for(db.session, 'after_flush')
+def refresh_daily_usage(session, flush_context):
+    stale = {} # resource_id -> set of days whose rollup must be recomputed
+
+    def mark(resource_id, start_time, end_time):
+        if resource_id is not None and start_time and end_time:
+            stale.setdefault(resource_id, set()).update(day for day, _ in split_hours_by_day(start_time, end_time))
+
+    def allocated_resources(event_id):
+        return session.connection().execute(
+            sa.select(EventResourceAllocation.resource_id).where(EventResourceAllocation.event_id == event_id)
+        ).scalars().all()
+
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, EventResourceAllocation):
+            # Allocations created from ids alone have no loaded event yet
+            event = obj.event or session.get(Event, obj.event_id)
+            if event is not None:
+                mark(obj.resource_id, event.start_time, event.end_time)
+    for obj in session.dirty:
+        if isinstance(obj, Event) and session.is_modified(obj):
+            state = sa.inspect(obj)
+            old_start = (state.attrs.start_time.history.deleted or [obj.start_time])[0]
+            old_end = (state.attrs.end_time.history.deleted or [obj.end_time])[0]
+            # Becoming recurring (or one-off) moves the event out of (or into) the rollup
+            recurrence_changed = bool(state.attrs.recurrence.history.deleted)
+            if (old_start, old_end) == (obj.start_time, obj.end_time) and not recurrence_changed:
+                continue
+            for resource_id in allocated_resources(obj.event_id):
+                mark(resource_id, old_start, old_end)
+                mark(resource_id, obj.start_time, obj.end_time)
+    for obj in session.deleted:
+        # Allocations left behind by a deleted event no longer count as bookings
+        if isinstance(obj, Event):
+            for resource_id in allocated_resources(obj.event_id):
+                mark(resource_id, obj.start_time, obj.end_time)
+
+    for resource_id, days in stale.items():
+        for first_day, last_day in contiguous_runs(days):
+            recompute_daily_usage(session.connection(), resource_id, first_day, last_day)
+
+def compute_daily_usage():
+    """Full recomputation of the rollup from the raw one-off bookings: {(resource_id, day): hours}."""
+    totals = {}
+    bookings = db.session.query(EventResourceAllocation.resource_id, Event.start_time, Event.end_time).join(Event).filter(
+        Event.recurrence.is_(None)
+    )
+    for resource_id, start_time, end_time in bookings.yield_per(10000):
+        for day, hours in split_hours_by_day(start_time, end_time):
+            key = (resource_id, day)
+            totals[key] = totals.get(key, 0) + hours
+    return totals
+
+def rebuild_daily_usage():
+    totals = compute_daily_usage()
+    db.session.execute(sa.delete(ResourceDailyUsage))
+    rows = [{'resource_id': resource_id, 'day': day, 'hours': hours} for (resource_id, day), hours in totals.items()]
+    for i in range(0, len(rows), 10000):
+        db.session.execute(sa.insert(ResourceDailyUsage), rows[i:i + 10000])
+    bump_data_version(db.session.connection())
+    db.session.commit()
+    return len(rows)
+
+def verify_daily_usage(tolerance=1e-6):
+    """Compares the rollup against a full recomputation. Returns a list of (resource_id, day, stored, expected)."""
+    expected = compute_daily_usage()
+    stored = {(row.resource_id, row.day): row.hours for row in db.session.query(ResourceDailyUsage).yield_per(10000)}
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if abs(stored.get(key, 0) - expected.get(key, 0)) > tolerance:
+            mismatches.append((key[0], key[1], stored.get(key, 0), expected.get(key, 0)))
+    return mismatches
+
+def ensure_daily_usage():
+    # Databases created before the rollup existed start with an empty table
+    if not app.extensions.get('daily_usage_ready'):
+        if db.session.query(ResourceDailyUsage.resource_id).first() is None and \
+                db.session.query(EventResourceAllocation.allocation_id).first() is not None:
+            rebuild_daily_usage()
+        app.extensions['daily_usage_ready'] = True
+
+rollup_cli = AppGroup('rollup', help='Maintain the daily resource utilization rollup.')
+app.cli.add_command(rollup_cli)
+
+@rollup_cli.command('rebuild')
+def rollup_rebuild_command():
+    """Recompute the rollup table from the raw bookings."""
+    click.echo(f'Rebuilt {rebuild_daily_usage()} rollup rows.')
+
+@rollup_cli.command('verify')
+def rollup_verify_command():
+    """Check the rollup table against a full recomputation."""
+    mismatches = verify_daily_usage()
+    for resource_id, day, stored, expected in mismatches:
+        click.echo(f'Resource {resource_id} on {day}: stored {stored:.4f}h, expected {expected:.4f}h')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup rows out of date. Run "flask rollup rebuild".')
+    click.echo('Rollup matches the raw bookings.')
+
+def occurrence_windows(start_time, end_time, series=None):
+    """
+    The (start, end) windows an event occupies for conflict checks: its own span, or each
+    occurrence of its series, up to RECURRENCE_HORIZON_DAYS ahead if the series never ends.
+    """
+    if series is None:
+        return [(start_time, end_time)]
+    horizon = None
+    if series.last_end is None:
+        horizon = max(start_time, datetime.now()) + timedelta(days=app.config['RECURRENCE_HORIZON_DAYS'])
+    return list(series.occurrences(None, horizon))
+
+def check_resource_conflict(resource_id, new_start_time, new_end_time, event_id=None, series=None):
     """
     Checks for resource conflicts with existing allocations.
     Returns a list of conflicting events or an empty list if no conflicts.
     """
-    conflicting_allocations = EventResourceAllocation.query.filter_by(resource_id=resource_id).join(Event).filter(
-        Event.end_time > new_start_time,
-        Event.start_time < new_end_time
-    )
-    if event_id:
-        conflicting_allocations = conflicting_allocations.filter(Event.event_id != event_id)
-    return conflicting_allocations.all()
+    return check_resources_conflicts([resource_id], new_start_time, new_end_time, event_id, series).get(resource_id, [])
+
+def check_resources_conflicts(resource_ids, new_start_time, new_end_time, event_id=None, series=None):
+    """
+    Checks several resources at once using the interval index. With a series, every
+    occurrence (see occurrence_windows) is checked. Inside in_write_transaction the index
+    reflects every commit up to the write lock, so a clear answer still holds at commit.
+    Returns a dict of resource_id -> list of conflicting EventOccurrence, only for resources with
+    conflicts. Each carries the times of the first occurrence that overlaps, so a clash with a
+    recurring event names the clashing date rather than the start of its series.
+    """
+    index = get_resource_index()
+    hits = {} # resource_id -> {event_id: (start, end)}
+    for window_start, window_end in occurrence_windows(new_start_time, new_end_time, series):
+        for resource_id in resource_ids:
+            for hit_start, hit_end, hit_id in index.overlapping_occurrences(resource_id, window_start, window_end, event_id):
+                hits.setdefault(resource_id, {}).setdefault(hit_id, (hit_start, hit_end))
+    if not hits:
+        return {}
+
+    # Load the conflicting events in a single query
+    event_ids = {hit_id for resource_hits in hits.values() for hit_id in resource_hits}
+    events = {event.event_id: event for event in Event.query.filter(Event.event_id.in_(event_ids))}
+    conflicts = {}
+    for resource_id, resource_hits in hits.items():
+        occurrences = [EventOccurrence(events[hit_id], start, end) for hit_id, (start, end) in resource_hits.items()
+                       if hit_id in events]
+        if occurrences:
+            conflicts[resource_id] = sorted(occurrences, key=lambda occurrence: (occurrence.start_time, occurrence.event_id))
+    return conflicts
+
+# Writes whose checks must still hold when they commit (bookings) run in a short transaction
+# that takes SQLite's write lock up front, so concurrent writers queue for it instead of
+# interleaving between check and insert. Readers are not blocked.
+
+def is_lock_error(error):
+    return isinstance(error, sa.exc.OperationalError) and 'locked' in str(error.orig)
+
+def begin_immediate():
+    """
+    Starts the session's transaction with BEGIN IMMEDIATE and brings the interval index up to
+    date (if it hasn't been loaded yet, the first get_resource_index() loads it); no other process
+    can commit until this transaction ends, so the index stays exact for conflict checks until
+    then. It must come before any write in the transaction.
+    """
+    connection = db.session.connection()
+    if connection.connection.dbapi_connection.in_transaction:
+        raise RuntimeError('begin_immediate() must start the transaction, before any write.')
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+    if resource_index.loaded:
+        sync_resource_index()
+
+def in_write_transaction(fn, *args):
+    """
+    Runs fn(*args) in a BEGIN IMMEDIATE transaction and commits, returning fn's result. If the
+    write lock isn't free within the busy timeout, the transaction is rolled back and fn is run
+    again from scratch after a jittered backoff, up to WRITE_RETRY_ATTEMPTS times; then
+    RetriesExhausted is raised. fn may roll back itself to abandon its changes.
+    """
+    def attempt():
+        try:
+            begin_immediate()
+            result = fn(*args)
+            db.session.commit()
+            return result
+        except BaseException:
+            db.session.rollback()
+            raise
+    return retry(attempt, is_lock_error, app.config['WRITE_RETRY_ATTEMPTS'], app.config['WRITE_RETRY_BASE_SECONDS'])
 
 @app.route('/')
 def index():
@@ -103,6 +626,196 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Response caching. Pages are cached under their route, parameters, the viewing user
+# and the data version, which is bumped in the same transaction as every change to
+# the data they show, so a write invalidates every cached page in every worker at once.
+
+CACHED_MODELS = (User, Event, Resource, EventResourceAllocation)
+
+def bump_data_version(connection):
+    connection.execute(
+        sqlite_insert(DataVersion).values(id=1, version=1)
+        .on_conflict_do_update(index_elements=[DataVersion.id], set_={'version': DataVersion.version + 1})
+    )
+
+@sa.event.listens_for(db.session, 'after_flush')
+def bump_data_version_on_change(session, flush_context):
+    if any(isinstance(obj, CACHED_MODELS) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        bump_data_version(session.connection())
+
+def get_data_version():
+    return db.session.execute(sa.select(DataVersion.version)).scalar() or 0
+
+def get_response_cache():
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        if app.config['RESPONSE_CACHE_BACKEND'] == 'sqlite':
+            path = app.config['RESPONSE_CACHE_PATH'] or os.path.join(app.instance_path, 'response_cache.db')
+            cache = SQLiteCache(path, app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        else:
+            cache = LRUCache(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        app.extensions['response_cache'] = cache
+    return cache
+
+def cached_page(methods=('GET', 'HEAD')):
+    """
+    Serves the decorated view from the response cache and answers If-None-Match
+    with 304 when the page is unchanged. Only plain 200 responses are stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Flashed messages are rendered into the page once, so those requests bypass the cache
+            if not current_app.config['RESPONSE_CACHE_ENABLED'] or request.method not in methods or '_flashes' in session:
+                return view(*args, **kwargs)
+            # The version is read before the view runs, so a cached page is never older than its key
+            key = '|'.join([
+                request.endpoint, request.method if request.method == 'POST' else 'GET',
+                repr(sorted(kwargs.items())), str(session.get('user_id')),
+                repr(sorted(request.args.items(multi=True))), repr(sorted(request.form.items(multi=True))),
+                f'v{get_data_version()}'
+            ])
+            cache = get_response_cache()
+            entry = cache.get(key)
+            if entry is not None:
+                etag, body, mimetype = entry
+                response = Response(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                # A modified session means the view flashed a message or logged someone in or out
+                if response.status_code != 200 or session.modified:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                cache.set(key, (etag, body, response.mimetype), current_app.config['RESPONSE_CACHE_TTL'])
+                response.headers['X-Cache'] = 'MISS'
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+# Change feed. Every change to events, resources and allocations is appended to the
+# Change log in the same transaction, and streamed to clients as Server-Sent Events
+# (see change_feed.py), so pages can react to other people's bookings without polling.
+
+def event_payload(event):
+    return {'event_id': event.event_id, 'title': event.title, 'start_time': event.start_time.isoformat(),
+            'end_time': event.end_time.isoformat(), 'recurrence': event.recurrence, 'user_id': event.user_id}
+
+def record_changes(connection, changes):
+    """Appends (name, payload dict) changes to the log and trims it to CHANGE_FEED_RETENTION entries."""
+    now = datetime.now()
+    connection.execute(sa.insert(Change), [
+        {'name': name, 'payload': json.dumps(payload), 'created_at': now} for name, payload in changes
+    ])
+    latest = sa.select(sa.func.max(Change.id)).scalar_subquery()
+    connection.execute(sa.delete(Change).where(Change.id <= latest - app.config['CHANGE_FEED_RETENTION']))
+
+@sa.event.listens_for(db.session, 'after_flush')
+def record_session_changes(session, flush_context):
+    changes = []
+    for action, objects in (('created', session.new), ('updated', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if action == 'updated' and not session.is_modified(obj):
+                continue
+            if isinstance(obj, Event):
+                changes.append((f'event.{action}', event_payload(obj)))
+            elif isinstance(obj, Resource):
+                changes.append((f'resource.{action}', {'resource_id': obj.resource_id, 'resource_name': obj.resource_name,
+                                                        'resource_type': obj.resource_type}))
+            elif isinstance(obj, EventResourceAllocation):
+                # The booked times let clients spot clashes with what they are about to book
+                event = obj.event or session.get(Event, obj.event_id)
+                payload = {'allocation_id': obj.allocation_id, 'resource_id': obj.resource_id}
+                payload.update(event_payload(event) if event else {'event_id': obj.event_id})
+                changes.append((f'allocation.{action}', payload))
+    if changes:
+        record_changes(session.connection(), changes)
+
+def record_bulk_change(connection, kind, rows):
+    """Core bulk inserts bypass the session hooks; clients are told to reload instead of getting every row. Returns the entry's id."""
+    record_changes(connection, [('data.imported', {'kind': kind, 'rows': rows})])
+    return connection.execute(sa.select(sa.func.max(Change.id))).scalar()
+
+def latest_change_id():
+    return db.session.execute(sa.select(sa.func.max(Change.id))).scalar() or 0
+
+def fetch_changes(after_id, limit=500):
+    """Up to limit (id, name, payload) changes after after_id, oldest first."""
+    return [tuple(row) for row in db.session.execute(
+        sa.select(Change.id, Change.name, Change.payload).where(Change.id > after_id).order_by(Change.id).limit(limit)
+    )]
+
+@app.template_global()
+def change_feed_url():
+    """Where pages subscribe to the change feed, or None when no feed is served (pages then skip it)."""
+    if app.config['CHANGE_FEED_URL']:
+        return app.config['CHANGE_FEED_URL']
+    return url_for('change_stream') if app.config['CHANGE_FEED_WSGI_STREAM'] else None
+
+@app.route('/changes')
+def change_stream():
+    """
+    Server-Sent Events stream of changes, each with its id, a name such as allocation.created
+    and a JSON payload. Resumes after Last-Event-ID (sent by EventSource when it reconnects)
+    or ?after=<id>, else starts with changes made from now on. Each open stream holds a worker
+    thread, so it is only served when CHANGE_FEED_WSGI_STREAM is set and ends after
+    CHANGE_FEED_STREAM_SECONDS; "flask feed serve" fans out to many clients without that cost.
+    """
+    if not current_app.config['CHANGE_FEED_WSGI_STREAM']:
+        abort(404)
+    after_id = parse_after(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    if after_id is None:
+        after_id = latest_change_id()
+    db.session.close() # Don't hold a database connection while the stream is open
+    config = current_app.config
+
+    def generate():
+        last_id = after_id
+        yield RETRY
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < config['CHANGE_FEED_STREAM_SECONDS']:
+            changes = fetch_changes(last_id)
+            db.session.close()
+            for change_id, name, payload in changes:
+                yield format_message(change_id, name, payload)
+                last_id = change_id
+            if changes:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= config['CHANGE_FEED_HEARTBEAT_SECONDS']:
+                yield HEARTBEAT
+                last_sent = time.monotonic()
+            time.sleep(config['CHANGE_FEED_POLL_SECONDS'])
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+feed_cli = AppGroup('feed', help='Live change feed.')
+app.cli.add_command(feed_cli)
+
+@feed_cli.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=5001, show_default=True, type=int)
+@click.option('--allowed-origin', help='Origin of the pages reading the feed, when they are served from another '
+                                       'host or port. Defaults to CHANGE_FEED_ALLOWED_ORIGIN.')
+def feed_serve_command(host, port, allowed_origin):
+    """Serve the change feed to many clients from one asyncio process."""
+    def fetch(after_id):
+        with app.app_context():
+            return fetch_changes(after_id)
+
+    broadcaster = Broadcaster(fetch, latest_change_id(), app.config['CHANGE_FEED_POLL_SECONDS'])
+    click.echo(f'Change feed on http://{host}:{port}/changes (set CHANGE_FEED_URL to this address)')
+    try:
+        asyncio.run(serve_change_feed(broadcaster, host, port, heartbeat=app.config['CHANGE_FEED_HEARTBEAT_SECONDS'],
+                                      allowed_origin=allowed_origin or app.config['CHANGE_FEED_ALLOWED_ORIGIN']))
+    except KeyboardInterrupt:
+        pass
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
@@ -111,9 +824,28 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username).first()
 
-        if user and user.check_password(password):
+        retry_after = login_retry_after(username)
+        if retry_after:
+            flash(f'Too many login attempts. Please try again in {retry_after} seconds.', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
+
+        user = User.query.filter_by(username=username).first()
+        try:
+            valid = user is not None and user.check_password(password)
+        except ExecutorBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+
+        if valid:
+            if user.password_needs_rehash():
+                # Hashing settings changed since this password was stored; upgrade it while we have it
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except ExecutorBusy:
+                    pass # Try again at the next login
+            session.regenerate() # New session id at login, so one planted beforehand can't be used
             session['user_id'] = user.id
             session['username'] = user.username
             flash('Logged in successfully.', 'success')
@@ -122,11 +854,24 @@ def login():
             flash('Invalid username or password.', 'danger')
     return render_template('login.html')
 
+def login_retry_after(username):
+    # Every attempt counts against both the username and the client address.
+    # Returns 0 if this attempt may proceed, else seconds until one would be allowed.
+    limiters = app.extensions.get('login_limiters')
+    if limiters is None:
+        window = app.config['LOGIN_RATE_LIMIT_WINDOW']
+        limiters = (RateLimiter(app.config['LOGIN_RATE_LIMIT_PER_USERNAME'], window),
+                    RateLimiter(app.config['LOGIN_RATE_LIMIT_PER_IP'], window))
+        app.extensions['login_limiters'] = limiters
+    by_username, by_ip = limiters
+    return max(by_username.hit(username.strip().lower()), by_ip.hit(request.remote_addr or ''))
+
 @app.route('/logout')
 @login_required
 def logout():
     session.pop('user_id', None)
     session.pop('username', None)
+    session.regenerate()
     flash('You have been logged out.', 'info')
     return redirect(url_for('home'))
 
@@ -141,7 +886,11 @@ def register():
             return render_template('register.html')
 
         new_user = User(username=username)
-        new_user.set_password(password)
+        try:
+            new_user.set_password(password)
+        except ExecutorBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('register.html'), 503, {'Retry-After': '1'}
         db.session.add(new_user)
         db.session.commit()
         flash('Registration successful! Please log in.', 'success')
@@ -151,7 +900,7 @@ def register():
 @app.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     if not user:
         flash('User not found. Please log in again.', 'danger')
         return redirect(url_for('logout'))
@@ -193,44 +942,190 @@ def profile():
 
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+DEFAULT_PROFILE_PIC = 'default_profile_pic.png'
+PROFILE_PIC_CACHE_SECONDS = 365 * 24 * 3600 # Stored names are content hashes, so they never change
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def profile_pic_folder():
+    return os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
+
+def build_thumbnails(name):
+    try:
+        image_store.make_thumbnails(profile_pic_folder(), name, app.config['PROFILE_PIC_SIZES'])
+    except Exception:
+        app.logger.exception('Could not make thumbnails for %s', name)
+
+def remove_unused_profile_pic(name):
+    # Call it inside the write transaction that stops using name, so the check and removal can't interleave with a new upload
+    if not name or name == DEFAULT_PROFILE_PIC or User.query.filter_by(profile_pic=name).first():
+        return
+    image_store.remove_image(profile_pic_folder(), name, app.config['PROFILE_PIC_SIZES'])
+
+@app.template_global()
+def profile_pic_url(user, size='small'):
+    """URL of the user's picture, as the thumbnail for size once it has been made."""
+    name = user.profile_pic or DEFAULT_PROFILE_PIC
+    if not image_store.STORED_NAME.match(name):
+        return url_for('static', filename='profile_pics/' + name) # Uploaded before content addressing
+    thumbnail = image_store.thumbnail_name(name, size)
+    if os.path.exists(os.path.join(profile_pic_folder(), thumbnail)):
+        name = thumbnail
+    return url_for('profile_pic_file', filename=name)
+
+@app.route('/profile_pics/<filename>')
+def profile_pic_file(filename):
+    if not image_store.SERVED_NAME.match(filename):
+        abort(404)
+    response = send_from_directory(profile_pic_folder(), filename, max_age=PROFILE_PIC_CACHE_SECONDS)
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/upload_profile_pic', methods=['POST'])
 @login_required
 def upload_profile_pic():
-    if 'file' not in request.files:
+    max_bytes = current_app.config['PROFILE_PIC_MAX_BYTES']
+    # Stop reading the request body early instead of receiving an oversized upload in full
+    request.max_content_length = max_bytes + 64 * 1024
+    limit = f'{max_bytes // (1024 * 1024)} MB' if max_bytes >= 1024 * 1024 else f'{max(1, max_bytes // 1024)} KB'
+    too_large = f'Profile pictures must be at most {limit}.'
+    try:
+        file = request.files.get('file')
+    except RequestEntityTooLarge:
+        flash(too_large, 'danger')
+        return redirect(url_for('profile'))
+    if file is None:
         flash('No file part', 'danger')
         return redirect(url_for('profile'))
-    file = request.files['file']
     if file.filename == '':
         flash('No selected file', 'danger')
         return redirect(url_for('profile'))
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        user = User.query.get(session['user_id'])
-        if user.profile_pic and user.profile_pic != 'default_profile_pic.png': # Delete old picture if not default
-            try:
-                os.remove(os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'], user.profile_pic))
-            except OSError:
-                pass # Ignore if file doesn't exist
-
-        file.save(os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'], filename))
-        user.profile_pic = filename
-        db.session.commit()
-        flash('Profile picture updated successfully!', 'success')
-    else:
+    if not allowed_file(file.filename):
         flash('Allowed image types are png, jpg, jpeg, gif', 'danger')
+        return redirect(url_for('profile'))
+    folder = profile_pic_folder()
+    try:
+        name, temp_path = image_store.receive_stream(file.stream, folder, max_bytes)
+    except image_store.UploadTooLarge:
+        flash(too_large, 'danger')
+        return redirect(url_for('profile'))
+    except ValueError:
+        flash('Allowed image types are png, jpg, jpeg, gif', 'danger')
+        return redirect(url_for('profile'))
+
+    user = get_current_user()
+    old_name = user.profile_pic
+
+    def switch_picture():
+        # The new file is put in place and the old one removed under the write lock, so an identical
+        # upload by another user can't reuse a file just as it is removed
+        user.profile_pic = name
+        image_store.install(temp_path, folder, name)
+        if old_name != name:
+            remove_unused_profile_pic(old_name) # Other users may share an identical picture
+
+    try:
+        in_write_transaction(switch_picture)
+    except RetriesExhausted:
+        image_store.discard(temp_path)
+        flash('The server is busy. Please try again in a moment.', 'warning')
+        return redirect(url_for('profile'))
+    if image_store.Image is not None:
+        get_thumbnail_executor().submit(build_thumbnails, name)
+    flash('Profile picture updated successfully!', 'success')
     return redirect(url_for('profile'))
 
 
+def parse_event_cursor(cursor):
+    """Parses an events page cursor of the form '<start_time ISO>,<event_id>'."""
+    start_str, _, event_id_str = cursor.rpartition(',')
+    start = datetime.fromisoformat(start_str)
+    if start.tzinfo is not None:
+        raise ValueError('Cursor times are naive, like event times.')
+    return start, int(event_id_str)
+
 @app.route('/events')
+@cached_page()
 def list_events():
-    events = Event.query.all()
-    return render_template('events.html', events=events)
-
+    # Keyset pagination on (start_time, event_id), optionally filtered by date window and owner
+    page_size = request.args.get('limit', current_app.config['EVENTS_PAGE_SIZE'], type=int)
+    page_size = max(1, min(page_size, current_app.config['EVENTS_MAX_PAGE_SIZE']))
+    owner = request.args.get('owner', type=int)
+    cursor = request.args.get('after', '')
+    start_date_str = request.args.get('start_date', '')
+    end_date_str = request.args.get('end_date', '')
+
+    try:
+        window_start = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        window_end = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1) if end_date_str else None
+    except ValueError:
+        flash('Invalid date format. Please use YYYY-MM-DD.', 'danger')
+        return redirect(url_for('list_events'))
+    after_start = after_id = None
+    if cursor:
+        try:
+            after_start, after_id = parse_event_cursor(cursor)
+        except ValueError:
+            flash('Invalid page cursor.', 'danger')
+            return redirect(url_for('list_events'))
+
+    query = Event.query.options(db.joinedload(Event.user))
+    if owner:
+        query = query.filter(Event.user_id == owner)
+    recurring = query.filter(Event.recurrence.isnot(None))
+    query = query.filter(Event.recurrence.is_(None))
+    if window_start:
+        query = query.filter(Event.end_time >= window_start)
+        recurring = recurring.filter(sa.or_(Event.series_end.is_(None), Event.series_end > window_start))
+    if window_end:
+        query = query.filter(Event.start_time < window_end)
+        recurring = recurring.filter(Event.start_time < window_end)
+    if cursor:
+        query = query.filter(sa.or_(
+            Event.start_time > after_start,
+            sa.and_(Event.start_time == after_start, Event.event_id > after_id)
+        ))
+        recurring = recurring.filter(sa.or_(Event.series_end.is_(None), Event.series_end > after_start))
+
+    # Fetch one extra row to know whether there is a next page. Occurrences of recurring
+    # events are generated lazily from the page start and merged in by (start_time, event_id).
+    streams = [((event.start_time, event.event_id, event) for event in
+                query.order_by(Event.start_time, Event.event_id).limit(page_size + 1))]
+    for event in recurring:
+        streams.append(listed_occurrences(event, window_start, window_end, after_start, after_id))
+    events = [event for _, _, event in itertools.islice(heapq.merge(*streams), page_size + 1)]
+    next_cursor = None
+    if len(events) > page_size:
+        events = events[:page_size]
+        next_cursor = f'{events[-1].start_time.isoformat()},{events[-1].event_id}'
+
+    filters = {'limit': page_size, 'owner': owner, 'start_date': start_date_str, 'end_date': end_date_str}
+    filters = {key: value for key, value in filters.items() if value}
+    return render_template('events.html', events=events, next_cursor=next_cursor, cursor=cursor, filters=filters)
+
+def listed_occurrences(event, window_start, window_end, after_start=None, after_id=None):
+    """Yields (start_time, event_id, EventOccurrence) for occurrences in the window that sort after the cursor."""
+    if after_start and (window_start is None or after_start > window_start):
+        window_start = after_start
+    for start, end in event.series.occurrences(window_start, window_end):
+        if after_start is None or (start, event.event_id) > (after_start, after_id):
+            yield start, event.event_id, EventOccurrence(event, start, end)
+
+def parse_event_times(start_time_str, end_time_str):
+    """
+    Parses and validates event start/end times (used by the event forms and imports).
+    Raises ValueError with a user-facing message.
+    """
+    try:
+        start_time = datetime.fromisoformat(start_time_str)
+        end_time = datetime.fromisoformat(end_time_str)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid date/time format. Please use YYYY-MM-DDTHH:MM.')
+    if start_time >= end_time:
+        raise ValueError('Start time must be before end time.')
+    return start_time, end_time
 
 @app.route('/events/add', methods=['GET', 'POST'])
 @login_required
@@ -242,17 +1137,13 @@ def add_event():
         description = request.form['description']
 
         try:
-            start_time = datetime.fromisoformat(start_time_str)
-            end_time = datetime.fromisoformat(end_time_str)
-        except ValueError:
-            flash('Invalid date/time format. Please use YYYY-MM-DDTHH:MM.', 'danger')
-            return render_template('event_form.html', event=None)
-
-        if start_time >= end_time:
-            flash('Start time must be before end time.', 'danger')
+            start_time, end_time = parse_event_times(start_time_str, end_time_str)
+            new_event = Event(title=title, start_time=start_time, end_time=end_time, description=description, user_id=session['user_id'])
+            new_event.set_recurrence(request.form.get('recurrence'))
+        except ValueError as e:
+            flash(str(e), 'danger')
             return render_template('event_form.html', event=None)
 
-        new_event = Event(title=title, start_time=start_time, end_time=end_time, description=description, user_id=session['user_id'])
         db.session.add(new_event)
         db.session.commit()
         flash('Event added successfully!', 'success')
@@ -268,36 +1159,48 @@ def edit_event(event_id):
         flash('You are not authorized to edit this event.', 'danger')
         return redirect(url_for('list_events'))
     if request.method == 'POST':
-        original_start_time = event.start_time
-        original_end_time = event.end_time
+        original_schedule = (event.start_time, event.end_time, event.recurrence)
 
-        event.title = request.form['title']
-        try:
-            event.start_time = datetime.fromisoformat(request.form['start_time'])
-            event.end_time = datetime.fromisoformat(request.form['end_time'])
-        except ValueError:
-            flash('Invalid date/time format. Please use YYYY-MM-DDTHH:MM.', 'danger')
-            return render_template('event_form.html', event=event)
+        def apply_form():
+            event.title = request.form['title']
+            event.start_time, event.end_time = parse_event_times(request.form['start_time'], request.form['end_time'])
+            event.set_recurrence(request.form.get('recurrence'))
+            event.description = request.form['description']
 
-        if event.start_time >= event.end_time:
-            flash('Start time must be before end time.', 'danger')
+        try:
+            apply_form()
+        except ValueError as e:
+            flash(str(e), 'danger')
             return render_template('event_form.html', event=event)
 
-        # Check for conflicts if event time has changed
-        if original_start_time != event.start_time or original_end_time != event.end_time:
-            # Get all resources currently allocated to this event
-            allocated_resources = [alloc.resource_id for alloc in event.allocations]
-            for resource_id in allocated_resources:
-                conflicts = check_resource_conflict(resource_id, event.start_time, event.end_time, event.event_id)
-                if conflicts:
-                    flash(f'Conflict detected for resource ID {resource_id} with updated event times!', 'danger')
-                    # Revert changes for now, or implement a more sophisticated conflict resolution
+        # Check for conflicts if event time or recurrence has changed
+        if original_schedule != (event.start_time, event.end_time, event.recurrence):
+            def save_if_still_free():
+                # Checked under the write lock; the form is applied again since a retry starts from a rolled-back session
+                apply_form()
+                # Check all resources currently allocated to this event in one go, before the change is
+                # flushed, since the first check in a process loads the index
+                with db.session.no_autoflush:
+                    allocated_resources = [alloc.resource_id for alloc in event.allocations]
+                    clashes = check_resources_conflicts(allocated_resources, event.start_time, event.end_time, event.event_id, event.series)
+                if clashes:
                     db.session.rollback()
-                    flash('Event update rolled back due to conflict.', 'danger')
-                    return render_template('event_form.html', event=event)
+                return clashes
 
-        event.description = request.form['description']
-        db.session.commit()
+            try:
+                conflicts = in_write_transaction(save_if_still_free)
+            except RetriesExhausted:
+                flash('The server is busy. Please try again in a moment.', 'warning')
+                return render_template('event_form.html', event=event), 503, {'Retry-After': '1'}
+            if conflicts:
+                for resource_id in conflicts:
+                    flash(f'Conflict detected for resource ID {resource_id} with updated event times!', 'danger')
+                # Revert changes for now, or implement a more sophisticated conflict resolution
+                db.session.rollback()
+                flash('Event update rolled back due to conflict.', 'danger')
+                return render_template('event_form.html', event=event)
+        else:
+            db.session.commit()
         flash('Event updated successfully!', 'success')
         return redirect(url_for('list_events'))
     return render_template('event_form.html', event=event)
@@ -309,8 +1212,9 @@ def delete_event(event_id):
     if event.user_id != session['user_id']:
         flash('You are not authorized to delete this event.', 'danger')
         return redirect(url_for('list_events'))
-    # Delete all associated allocations first
-    EventResourceAllocation.query.filter_by(event_id=event.event_id).delete()
+    # Delete all associated allocations first (through the session so the rollup sees them)
+    for allocation in event.allocations:
+        db.session.delete(allocation)
     db.session.delete(event)
     db.session.commit()
     flash('Event deleted successfully!', 'success')
@@ -319,6 +1223,7 @@ def delete_event(event_id):
 # Resources
 
 @app.route('/resources')
+@cached_page()
 def list_resources():
     resources = Resource.query.all()
     return render_template('resources.html', resources=resources)
@@ -356,31 +1261,552 @@ def allocate_resource():
         event = Event.query.get_or_404(event_id)
         resource = Resource.query.get_or_404(resource_id)
 
-        # Check for conflicts
-        conflicts = check_resource_conflict(resource.resource_id, event.start_time, event.end_time, event.event_id)
+        try:
+            status, conflicts = in_write_transaction(book_resource, event, resource.resource_id)
+        except RetriesExhausted:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return redirect(url_for('allocate_resource'))
         if conflicts:
             flash(f'Conflict detected for resource {resource.resource_name}! Already booked by:', 'danger')
-            for conflict_alloc in conflicts:
-                flash(f'- Event: {conflict_alloc.event.title} ({conflict_alloc.event.start_time} to {conflict_alloc.event.end_time})', 'danger')
+            for conflict in conflicts:
+                flash(f'- Event: {conflict.title} ({conflict.start_time} to {conflict.end_time})', 'danger')
+            # Suggest when the resource is next free for an event of this length
+            suggestions = find_available_slots(
+                [resource.resource_id], event.end_time - event.start_time, event.start_time,
+                event.start_time + timedelta(days=current_app.config['SLOT_SEARCH_DEFAULT_DAYS']), limit=3,
+                exclude_event_id=event.event_id
+            )
+            if suggestions:
+                flash(f'{resource.resource_name} is next free at: ' + ', '.join(str(start) for start, _ in suggestions), 'info')
             return redirect(url_for('allocate_resource'))
 
-        existing_allocation = EventResourceAllocation.query.filter_by(event_id=event_id, resource_id=resource_id).first()
-        if existing_allocation:
+        if status == 'exists':
             flash('Resource already allocated to this event.', 'warning')
         else:
-            allocation = EventResourceAllocation(event_id=event_id, resource_id=resource_id)
-            db.session.add(allocation)
-            db.session.commit()
             flash('Resource allocated successfully!', 'success')
         return redirect(url_for('list_events'))
 
-    events = Event.query.all()
-    resources = Resource.query.all()
-    allocations = EventResourceAllocation.query.all()
-    return render_template('allocate_resource.html', events=events, resources=resources, allocations=allocations)
+    # Only the first page of each picker is rendered; the rest is reached through the search endpoints
+    picker_size = current_app.config['PICKER_PAGE_SIZE']
+    events = search_events_query('').limit(picker_size).all()
+    resources = search_resources_query('').limit(picker_size).all()
+
+    # Newest allocations first, paged by allocation_id, with event and resource loaded in the same query
+    before = request.args.get('before', type=int)
+    allocations_query = EventResourceAllocation.query.options(
+        db.joinedload(EventResourceAllocation.event), db.joinedload(EventResourceAllocation.resource)
+    )
+    if before:
+        allocations_query = allocations_query.filter(EventResourceAllocation.allocation_id < before)
+    page_size = current_app.config['ALLOCATIONS_PAGE_SIZE']
+    allocations = allocations_query.order_by(EventResourceAllocation.allocation_id.desc()).limit(page_size + 1).all()
+    older_cursor = None
+    if len(allocations) > page_size:
+        allocations = allocations[:page_size]
+        older_cursor = allocations[-1].allocation_id
+    return render_template('allocate_resource.html', events=events, resources=resources, allocations=allocations,
+                           older_cursor=older_cursor, before=before)
+
+
+def book_resource(event, resource_id):
+    """
+    Allocates resource_id to event unless it already is or the database shows a clash.
+    Run it with in_write_transaction. Returns (status, conflicting occurrences), where
+    status is 'allocated', 'exists' or 'conflict'.
+    """
+    if EventResourceAllocation.query.filter_by(event_id=event.event_id, resource_id=resource_id).first():
+        return 'exists', []
+    conflicts = check_resource_conflict(resource_id, event.start_time, event.end_time, event.event_id, event.series)
+    if conflicts:
+        return 'conflict', conflicts
+    db.session.add(EventResourceAllocation(event_id=event.event_id, resource_id=resource_id))
+    return 'allocated', []
+
+def contains_pattern(term):
+    # LIKE pattern matching term anywhere, with % and _ in it matched literally (use with escape='\\')
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def search_events_query(term):
+    # Without a search term only events that haven't ended yet (or series still running) are offered
+    query = Event.query
+    if term:
+        query = query.filter(Event.title.ilike(contains_pattern(term), escape='\\'))
+    else:
+        now = datetime.now()
+        query = query.filter(sa.or_(
+            Event.end_time >= now,
+            sa.and_(Event.recurrence.isnot(None), sa.or_(Event.series_end.is_(None), Event.series_end >= now))
+        ))
+    return query.order_by(Event.start_time, Event.event_id)
+
+def search_resources_query(term):
+    query = Resource.query
+    if term:
+        pattern = contains_pattern(term)
+        query = query.filter(sa.or_(Resource.resource_name.ilike(pattern, escape='\\'),
+                                    Resource.resource_type.ilike(pattern, escape='\\')))
+    return query.order_by(Resource.resource_name)
+
+def picker_limit():
+    return max(1, min(request.args.get('limit', current_app.config['PICKER_PAGE_SIZE'], type=int), 100))
+
+@app.route('/events/search')
+def search_events():
+    events = search_events_query(request.args.get('q', '').strip()).limit(picker_limit()).all()
+    return jsonify([{
+        'id': event.event_id,
+        'label': f'{event.title} ({event.start_time} - {event.end_time})'
+    } for event in events])
+
+@app.route('/resources/search')
+def search_resources():
+    resources = search_resources_query(request.args.get('q', '').strip()).limit(picker_limit()).all()
+    return jsonify([{
+        'id': resource.resource_id,
+        'label': f'{resource.resource_name} ({resource.resource_type})'
+    } for resource in resources])
+
+
+def chunked(items, size):
+    # Lazily groups any iterable into lists of at most size items
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def allocate_many(pairs, atomic=False):
+    """
+    Allocates many (event_id, resource_id) pairs in a single transaction.
+    Each pair is checked against existing bookings and against pairs accepted earlier in the same batch.
+    Returns one result dict per pair, in order. With atomic=True nothing is inserted unless every pair succeeds.
+    The checks and inserts share one write transaction, so concurrent writers can't double-book.
+    Raises RetriesExhausted when the database stays busy.
+    """
+    return in_write_transaction(check_and_allocate_many, pairs, atomic)
+
+def check_and_allocate_many(pairs, atomic):
+    event_ids = {event_id for event_id, _ in pairs}
+    resource_ids = {resource_id for _, resource_id in pairs}
+
+    events = {}
+    existing_resources = set()
+    existing_pairs = set()
+    for chunk in chunked(event_ids, 500):
+        events.update((event.event_id, event) for event in Event.query.filter(Event.event_id.in_(chunk)))
+        allocated = db.session.query(EventResourceAllocation.event_id, EventResourceAllocation.resource_id).filter(
+            EventResourceAllocation.event_id.in_(chunk)
+        )
+        existing_pairs.update((event_id, resource_id) for event_id, resource_id in allocated if resource_id in resource_ids)
+    for chunk in chunked(resource_ids, 500):
+        found = db.session.query(Resource.resource_id).filter(Resource.resource_id.in_(chunk))
+        existing_resources.update(resource_id for (resource_id,) in found)
+
+    # Windows each event occupies (every occurrence for recurring events), and the overall
+    # window each resource is requested for, so existing bookings are fetched once per resource
+    event_windows = {event_id: occurrence_windows(event.start_time, event.end_time, event.series)
+                     for event_id, event in events.items()}
+    windows = {}
+    for event_id, resource_id in pairs:
+        if event_id in events and resource_id in existing_resources and event_windows[event_id]:
+            first, last = event_windows[event_id][0][0], event_windows[event_id][-1][1]
+            start, end = windows.get(resource_id, (first, last))
+            windows[resource_id] = (min(start, first), max(end, last))
+
+    # Existing bookings go into a batch-local interval index, and so do pairs accepted below
+    titles = {event_id: event.title for event_id, event in events.items()}
+    spans = {event_id: (event.start_time, event.end_time, event.series) for event_id, event in events.items()}
+    allocations = []
+    for chunk in chunked(windows.items(), 200):
+        bookings = db.session.query(
+            EventResourceAllocation.resource_id, Event.event_id, Event.title, Event.start_time, Event.end_time
+        ).join(Event).filter(Event.recurrence.is_(None), sa.or_(*(
+            sa.and_(EventResourceAllocation.resource_id == resource_id, Event.end_time > start, Event.start_time < end)
+            for resource_id, (start, end) in chunk
+        )))
+        for resource_id, event_id, title, start, end in bookings:
+            spans[event_id] = (start, end, None)
+            allocations.append((event_id, resource_id))
+            titles[event_id] = title
+    for chunk in chunked(windows, 500):
+        recurring_bookings = db.session.execute(
+            sa.select(EventResourceAllocation.resource_id, Event).join(Event).where(
+                Event.recurrence.isnot(None), EventResourceAllocation.resource_id.in_(chunk)
+            )
+        )
+        for resource_id, event in recurring_bookings:
+            spans[event.event_id] = (event.start_time, event.end_time, event.series)
+            allocations.append((event.event_id, resource_id))
+            titles[event.event_id] = event.title
+    batch_index = ResourceIntervalIndex()
+    batch_index.load(((event_id,) + span for event_id, span in spans.items()), allocations)
+
+    results = []
+    accepted = []
+    seen = set()
+    for event_id, resource_id in pairs:
+        result = {'event_id': event_id, 'resource_id': resource_id}
+        results.append(result)
+        event = events.get(event_id)
+        if event is None or resource_id not in existing_resources:
+            result['status'] = 'not_found'
+        elif (event_id, resource_id) in existing_pairs:
+            result['status'] = 'exists'
+        elif (event_id, resource_id) in seen:
+            result['status'] = 'duplicate'
+        else:
+            # The first occurrence of each clashing event that overlaps, not the start of its series
+            conflicting = {}
+            for start, end in event_windows[event_id]:
+                for hit_start, hit_end, hit_id in batch_index.overlapping_occurrences(resource_id, start, end, event_id):
+                    conflicting.setdefault(hit_id, (hit_start, hit_end))
+            if conflicting:
+                result['status'] = 'conflict'
+                result['conflicts'] = [{
+                    'event_id': hit_id,
+                    'title': titles[hit_id],
+                    'start_time': conflicting[hit_id][0].isoformat(),
+                    'end_time': conflicting[hit_id][1].isoformat()
+                } for hit_id in sorted(conflicting)]
+            else:
+                # Later pairs in the batch must not overlap this one either
+                batch_index.add_allocation(event_id, resource_id)
+                result['status'] = 'allocated'
+                accepted.append((event_id, resource_id))
+        seen.add((event_id, resource_id))
+
+    if atomic and any(result['status'] not in ('allocated', 'exists') for result in results):
+        for result in results:
+            if result['status'] == 'allocated':
+                result['status'] = 'rolled_back'
+        return results
+
+    db.session.add_all(EventResourceAllocation(event_id=event_id, resource_id=resource_id) for event_id, resource_id in accepted)
+    return results
+
+@app.route('/allocate/bulk', methods=['POST'])
+def allocate_bulk():
+    """
+    Allocates a batch of resources to events in one transaction.
+    Expects JSON: {"allocations": [{"event_id": 1, "resource_id": 2}, ...], "atomic": false}
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('allocations')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty "allocations" list.'}), 400
+    if len(items) > current_app.config['BULK_ALLOCATION_MAX_ITEMS']:
+        return jsonify({'error': f'At most {current_app.config["BULK_ALLOCATION_MAX_ITEMS"]} allocations per request.'}), 400
+    try:
+        pairs = [(int(item['event_id']), int(item['resource_id'])) for item in items]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each allocation needs integer "event_id" and "resource_id".'}), 400
+
+    atomic = bool(payload.get('atomic', False))
+    try:
+        results = allocate_many(pairs, atomic=atomic)
+    except RetriesExhausted:
+        return jsonify({'error': 'The database is busy. Please retry.'}), 503, {'Retry-After': '1'}
+    allocated = sum(1 for result in results if result['status'] == 'allocated')
+    status_code = 409 if atomic and any(result['status'] == 'rolled_back' for result in results) else 200
+    return jsonify({'allocated': allocated, 'results': results}), status_code
+
+
+def find_available_slots(resource_ids, duration, window_start, window_end, limit=5, step=None, exclude_event_id=None):
+    """
+    Finds the earliest free slots of the given duration when all of resource_ids are available.
+    Busy intervals of every resource come from the interval index and are merged in a single sweep.
+    """
+    # Closing the stream as soon as enough slots are found releases the index lock
+    with contextlib.closing(get_resource_index().busy_intervals(resource_ids, window_start, window_end, exclude_event_id)) as busy:
+        return find_free_slots(busy, window_start, window_end, duration, limit, step)
+
+def parse_window_args(args, default_start, default_days):
+    """
+    Reads the start/end parameters (ISO date or datetime) of a search window; they default to default_start
+    and default_days after start. Raises ValueError with a user-facing message, including for values with a
+    time zone offset, since event times are stored as naive local times and cannot be compared with them.
+    """
+    try:
+        window_start = datetime.fromisoformat(args['start']) if args.get('start') else default_start
+        window_end = datetime.fromisoformat(args['end']) if args.get('end') else window_start + timedelta(days=default_days)
+    except ValueError:
+        raise ValueError('Invalid start or end.')
+    if window_start.tzinfo is not None or window_end.tzinfo is not None:
+        raise ValueError('start and end must not include a time zone offset.')
+    return window_start, window_end
+
+@app.route('/slots')
+def available_slots():
+    """
+    Earliest free slots for a set of resources.
+    Query parameters: resource_ids=1,2,3, duration (minutes), optional start/end (ISO date or datetime),
+    limit (max 100), step (minutes between candidate starts) and exclude_event_id.
+    """
+    try:
+        resource_ids = {int(value) for value in request.args.get('resource_ids', '').split(',') if value.strip()}
+        duration = timedelta(minutes=request.args.get('duration', type=int) or 0)
+        step = timedelta(minutes=request.args.get('step', 0, type=int))
+        limit = max(1, min(request.args.get('limit', 5, type=int), 100))
+    except ValueError:
+        return jsonify({'error': 'Invalid resource_ids.'}), 400
+    try:
+        window_start, window_end = parse_window_args(request.args, datetime.now().replace(second=0, microsecond=0),
+                                                     current_app.config['SLOT_SEARCH_DEFAULT_DAYS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not resource_ids:
+        return jsonify({'error': 'resource_ids is required.'}), 400
+    if duration <= timedelta(0) or step < timedelta(0):
+        return jsonify({'error': 'duration must be a positive number of minutes.'}), 400
+    if window_end <= window_start or window_end - window_start > timedelta(days=current_app.config['SLOT_SEARCH_MAX_DAYS']):
+        return jsonify({'error': f'The search window must be positive and at most {current_app.config["SLOT_SEARCH_MAX_DAYS"]} days.'}), 400
+
+    slots = find_available_slots(resource_ids, duration, window_start, window_end, limit, step or None,
+                                 request.args.get('exclude_event_id', type=int))
+    return jsonify({'slots': [{'start_time': start.isoformat(), 'end_time': end.isoformat()} for start, end in slots]})
+
+
+AVAILABILITY_GRANULARITIES = {'15min': timedelta(minutes=15), 'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+def bookings_in_window(window_start, window_end, resource_filters=()):
+    """
+    Yields (resource_id, event_id, start, end) for every booking overlapping [window_start, window_end)
+    on resources matching resource_filters (conditions on Resource or EventResourceAllocation). One query fetches the
+    one-off events and the recurring series running into the window; series are expanded
+    only inside the window.
+    """
+    columns = (EventResourceAllocation.resource_id, Event.event_id, Event.start_time, Event.end_time, Event.recurrence)
+    one_off = sa.select(*columns).join(Event).where(
+        Event.recurrence.is_(None), Event.start_time < window_end, Event.end_time > window_start)
+    recurring = sa.select(*columns).join(Event).where(
+        Event.recurrence.isnot(None), Event.start_time < window_end,
+        sa.or_(Event.series_end.is_(None), Event.series_end > window_start))
+    if resource_filters:
+        one_off = one_off.join(Resource).where(*resource_filters)
+        recurring = recurring.join(Resource).where(*resource_filters)
+    for resource_id, event_id, start, end, recurrence in db.session.execute(sa.union_all(one_off, recurring)):
+        if recurrence is None:
+            yield resource_id, event_id, start, end
+        else:
+            for occurrence_start, occurrence_end in Series(recurrence, start, end).occurrences(window_start, window_end):
+                yield resource_id, event_id, occurrence_start, occurrence_end
+
+def build_availability_matrix(resources, resource_filters, window_start, window_end, bucket):
+    """
+    Occupancy of each resource in consecutive buckets from window_start until window_end
+    (the last bucket may run past it). Returns (bucket count, {resource_id: bits}) where
+    bit i is set when the resource is booked for any part of bucket i.
+    """
+    count = -((window_start - window_end) // bucket)
+    intervals = {resource.resource_id: [] for resource in resources}
+    for resource_id, _, start, end in bookings_in_window(window_start, window_start + count * bucket, resource_filters):
+        # A resource created after the resource list was read is not in this matrix
+        if resource_id in intervals:
+            intervals[resource_id].append((start, end))
+    return count, {resource_id: occupancy_bits(spans, window_start, bucket, count) for resource_id, spans in intervals.items()}
+
+def parse_availability_args(args, max_cells):
+    """
+    Reads the matrix parameters shared by the JSON and grid views. Raises ValueError with a user-facing message.
+    Returns (resources, resource_filters, window_start, window_end, granularity).
+    """
+    granularity = args.get('granularity', 'hour')
+    if granularity not in AVAILABILITY_GRANULARITIES:
+        raise ValueError(f'granularity must be one of {", ".join(AVAILABILITY_GRANULARITIES)}.')
+    window_start, window_end = parse_window_args(args, datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+                                                 current_app.config['AVAILABILITY_DEFAULT_DAYS'])
+    try:
+        resource_ids = {int(value) for value in args.get('resource_ids', '').split(',') if value.strip()}
+    except ValueError:
+        raise ValueError('Invalid resource_ids.')
+    if window_end <= window_start:
+        raise ValueError('end must be after start.')
+
+    # Kept as conditions, so an unfiltered matrix reads the window's bookings without a resource lookup per row
+    resource_filters = []
+    if resource_ids:
+        resource_filters.append(Resource.resource_id.in_(resource_ids))
+    if args.get('type'):
+        resource_filters.append(Resource.resource_type == args['type'])
+    resources = Resource.query.filter(*resource_filters).order_by(Resource.resource_name, Resource.resource_id).all()
+    cells = len(resources) * -((window_start - window_end) // AVAILABILITY_GRANULARITIES[granularity])
+    if cells > max_cells:
+        raise ValueError(f'That is {cells} cells; narrow the resources or window, or use a coarser granularity '
+                         f'(at most {max_cells}).')
+    return resources, resource_filters, window_start, window_end, granularity
+
+@app.route('/availability')
+@cached_page()
+def availability_matrix():
+    """
+    Occupancy matrix of resources x time buckets.
+    Query parameters: optional start/end (ISO date or datetime; default today and AVAILABILITY_DEFAULT_DAYS later),
+    granularity (15min, hour or day), resource_ids=1,2,3 and type. Each resource's "busy" string has one
+    character per bucket: "1" when booked for any part of it, else "0".
+    """
+    try:
+        resources, resource_filters, window_start, window_end, granularity = parse_availability_args(
+            request.args, current_app.config['AVAILABILITY_MAX_CELLS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    bucket = AVAILABILITY_GRANULARITIES[granularity]
+    count, bits = build_availability_matrix(resources, resource_filters, window_start, window_end, bucket)
+    return jsonify({
+        'start': window_start.isoformat(),
+        'end': (window_start + count * bucket).isoformat(),
+        'granularity': granularity,
+        'bucket_minutes': int(bucket.total_seconds() // 60),
+        'buckets': count,
+        'resources': [{
+            'resource_id': resource.resource_id,
+            'resource_name': resource.resource_name,
+            'resource_type': resource.resource_type,
+            # Bit 0 is the first bucket, so the binary digits are reversed
+            'busy': format(bits[resource.resource_id], f'0{count}b')[::-1]
+        } for resource in resources]
+    })
+
+@app.route('/availability/grid')
+@cached_page()
+def availability_grid():
+    try:
+        resources, resource_filters, window_start, window_end, granularity = parse_availability_args(
+            request.args, current_app.config['AVAILABILITY_GRID_MAX_CELLS'])
+    except ValueError as e:
+        return render_template('availability.html', error=str(e), args=request.args,
+                               granularities=AVAILABILITY_GRANULARITIES), 400
+    bucket = AVAILABILITY_GRANULARITIES[granularity]
+    count, bits = build_availability_matrix(resources, resource_filters, window_start, window_end, bucket)
+    bucket_starts = [window_start + i * bucket for i in range(count)]
+    rows = [(resource, format(bits[resource.resource_id], f'0{count}b')[::-1]) for resource in resources]
+    # (day, number of buckets) for the header row above hours and quarter hours
+    days = [(day, len(list(group))) for day, group in itertools.groupby(bucket_starts, key=lambda moment: moment.date())]
+    return render_template('availability.html', rows=rows, bucket_starts=bucket_starts, days=days, granularity=granularity,
+                           window_start=window_start, window_end=window_end, args=request.args,
+                           granularities=AVAILABILITY_GRANULARITIES)
+
+
+def clipped_hours_by_resource(window_start=None, window_end=None):
+    """
+    Grouped query of one-off booked hours per resource, with each booking clipped to [window_start, window_end].
+    Bookings touching the window are selected with the same bounds the report has always used.
+    """
+    in_range = [Event.recurrence.is_(None)]
+    if window_start:
+        in_range.append(Event.end_time >= window_start)
+    if window_end:
+        in_range.append(Event.start_time <= window_end)
+
+    overlap_start = sa.func.max(Event.start_time, window_start) if window_start else Event.start_time
+    overlap_end = sa.func.min(Event.end_time, window_end) if window_end else Event.end_time
+    overlap_hours = sa.case(
+        (overlap_end > overlap_start, (sa.func.julianday(overlap_end) - sa.func.julianday(overlap_start)) * 24),
+        else_=0
+    )
+    return db.session.query(
+        EventResourceAllocation.resource_id, sa.func.sum(overlap_hours)
+    ).join(Event).filter(*in_range).group_by(EventResourceAllocation.resource_id)
+
+def recurring_bookings(window_start=None, window_end=None):
+    """Yields (resource_id, event) for allocated recurring events with occurrences touching the window."""
+    in_range = [Event.recurrence.isnot(None)]
+    if window_start:
+        in_range.append(sa.or_(Event.series_end.is_(None), Event.series_end >= window_start))
+    if window_end:
+        in_range.append(Event.start_time <= window_end)
+    yield from db.session.execute(sa.select(EventResourceAllocation.resource_id, Event).join(Event).where(*in_range))
+
+def recurring_hours_by_resource(window_start=None, window_end=None, now=None):
+    """
+    Booked hours of recurring events per resource inside [window_start, window_end], expanding
+    only the occurrences in that window. Without an end, open-ended series count up to
+    RECURRENCE_HORIZON_DAYS from now.
+    """
+    horizon = (now or datetime.now()) + timedelta(days=app.config['RECURRENCE_HORIZON_DAYS'])
+    hours = {}
+    for resource_id, event in recurring_bookings(window_start, window_end):
+        series = event.series
+        end = window_end or (horizon if series.last_end is None else None)
+        for occurrence_start, occurrence_end in series.occurrences(window_start, end):
+            overlap = min(occurrence_end, end or occurrence_end) - max(occurrence_start, window_start or occurrence_start)
+            hours[resource_id] = hours.get(resource_id, 0) + overlap.total_seconds() / 3600
+    return hours
+
+def build_utilization_report(start_date=None, end_date=None, now=None):
+    """
+    Computes hours utilized and upcoming bookings per resource for the given date range.
+    Whole days come from the ResourceDailyUsage rollup; only partial days at either end
+    of the range are clipped from the raw bookings. Recurring events are expanded within the range.
+    """
+    now = now or datetime.now()
+    ensure_daily_usage()
+
+    # Split the range into whole days (summed from the rollup) and partial days at either end
+    midnight = datetime.min.time()
+    first_full_day = last_full_day = None
+    partial_windows = []
+    if start_date:
+        first_full_day = start_date.date()
+        if start_date.time() != midnight:
+            first_full_day += timedelta(days=1)
+            partial_windows.append((start_date, datetime.combine(first_full_day, midnight)))
+    if end_date:
+        last_full_day = end_date.date() - timedelta(days=1)
+        if end_date.time() != midnight:
+            partial_windows.append((datetime.combine(end_date.date(), midnight), end_date))
+
+    if first_full_day and last_full_day and first_full_day > last_full_day + timedelta(days=1):
+        # The whole range lies within a single day
+        sources = [clipped_hours_by_resource(start_date, end_date)]
+    else:
+        rollup = db.session.query(ResourceDailyUsage.resource_id, sa.func.sum(ResourceDailyUsage.hours))
+        if first_full_day:
+            rollup = rollup.filter(ResourceDailyUsage.day >= first_full_day)
+        if last_full_day:
+            rollup = rollup.filter(ResourceDailyUsage.day <= last_full_day)
+        sources = [rollup.group_by(ResourceDailyUsage.resource_id)]
+        sources += [clipped_hours_by_resource(*window) for window in partial_windows]
+
+    sources.append(recurring_hours_by_resource(start_date, end_date, now).items())
+
+    hours = {}
+    for source in sources:
+        for resource_id, resource_hours in source:
+            hours[resource_id] = hours.get(resource_id, 0) + (resource_hours or 0)
+
+    in_range = [Event.recurrence.is_(None)]
+    if start_date:
+        in_range.append(Event.end_time >= start_date)
+    if end_date:
+        in_range.append(Event.start_time <= end_date)
+    upcoming = {}
+    upcoming_rows = db.session.execute(
+        sa.select(EventResourceAllocation.resource_id, Event).join(Event).where(Event.end_time > now, *in_range)
+        .order_by(EventResourceAllocation.resource_id, Event.start_time, EventResourceAllocation.allocation_id)
+    )
+    for resource_id, event in upcoming_rows:
+        upcoming.setdefault(resource_id, []).append(event)
+    # Recurring events list only their next occurrence
+    for resource_id, event in recurring_bookings(start_date, end_date):
+        start = max(now, start_date) if start_date else now
+        occurrence = next(event.series.occurrences(start, end_date), None)
+        if occurrence:
+            upcoming.setdefault(resource_id, []).append(EventOccurrence(event, *occurrence))
+    for bookings in upcoming.values():
+        bookings.sort(key=lambda booking: booking.start_time)
+
+    resources = db.session.query(Resource.resource_id, Resource.resource_name, Resource.resource_type).order_by(Resource.resource_id)
+    return [{
+        'resource_name': resource_name,
+        'resource_type': resource_type,
+        'total_hours_utilized': round(hours.get(resource_id, 0), 2),
+        'upcoming_bookings': upcoming.get(resource_id, [])
+    } for resource_id, resource_name, resource_type in resources]
 
 
 @app.route('/report/utilization', methods=['GET', 'POST'])
+@cached_page(methods=('GET', 'HEAD', 'POST')) # POST only carries the date filter
 def resource_utilization_report():
     report_data = []
     start_date = None
@@ -397,52 +1823,415 @@ def resource_utilization_report():
             flash('Invalid date format. Please use YYYY-MM-DD.', 'danger')
             return render_template('resource_utilization_report.html', report_data=[], start_date=None, end_date=None)
 
-    resources = Resource.query.all()
-    for resource in resources:
-        total_hours_utilized = 0
-        upcoming_bookings = []
+    report_data = build_utilization_report(start_date, end_date)
+    return render_template('resource_utilization_report.html', report_data=report_data, start_date=start_date, end_date=end_date)
 
-        allocations = EventResourceAllocation.query.filter_by(resource_id=resource.resource_id).join(Event).all()
 
-        for allocation in allocations:
-            event = allocation.event
-            # Filter by date range if provided
-            if start_date and event.end_time < start_date:
+# Bulk import / export
+
+EXPORT_COLUMNS = {
+    'events': ('event_id', 'user_id', 'title', 'start_time', 'end_time', 'description', 'recurrence'),
+    'resources': ('resource_id', 'resource_name', 'resource_type'),
+    'allocations': ('allocation_id', 'event_id', 'resource_id'),
+}
+EXPORT_MODELS = {'events': Event, 'resources': Resource, 'allocations': EventResourceAllocation}
+
+def optional_id(row, column):
+    value = row.get(column)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {column}: {value!r}.')
+
+def required_text(row, column):
+    value = str(row.get(column) or '').strip()
+    if not value:
+        raise ValueError(f'Missing {column}.')
+    return value
+
+def import_events_chunk(chunk, reject, default_user_id):
+    prepared = []
+    for line, row in chunk:
+        try:
+            if row is None:
+                raise ValueError('Not a JSON object.')
+            start_time, end_time = parse_event_times(row.get('start_time'), row.get('end_time'))
+            series = Series(row['recurrence'], start_time, end_time) if row.get('recurrence') else None
+            values = {
+                'title': required_text(row, 'title'),
+                'start_time': start_time,
+                'end_time': end_time,
+                'description': row.get('description') or None,
+                'recurrence': str(series.rule) if series else None,
+                'series_end': series.last_end if series else None,
+                'user_id': optional_id(row, 'user_id') or default_user_id
+            }
+            if values['user_id'] is None:
+                raise ValueError('Missing user_id.')
+            event_id = optional_id(row, 'event_id')
+            if event_id:
+                values['event_id'] = event_id
+        except ValueError as e:
+            reject(line, str(e))
+            continue
+        prepared.append((line, values))
+
+    if not prepared:
+        return 0
+
+    def insert_events():
+        # Checked and inserted under the write lock, so a concurrent import can't take the same ids
+        rejected = []
+        known_users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_({v['user_id'] for _, v in prepared}))}
+        taken = {event_id for (event_id,) in db.session.query(Event.event_id).filter(
+            Event.event_id.in_({v['event_id'] for _, v in prepared if 'event_id' in v}))}
+        with_ids, without_ids = [], []
+        for line, values in prepared:
+            if values['user_id'] not in known_users:
+                rejected.append((line, f'Unknown user_id {values["user_id"]}.'))
+            elif 'event_id' not in values:
+                without_ids.append(values)
+            elif values['event_id'] in taken:
+                rejected.append((line, f'Event {values["event_id"]} already exists.'))
+            else:
+                taken.add(values['event_id'])
+                with_ids.append(values)
+
+        # executemany needs the same columns in every row, so rows with and without ids go separately
+        table = Event.__table__
+        spans = []
+        for batch in (with_ids, without_ids):
+            if batch:
+                inserted = db.session.execute(
+                    sa.insert(table).returning(table.c.event_id, table.c.start_time, table.c.end_time, table.c.recurrence), batch)
+                spans.extend((event_id, start, end, Series(recurrence, start, end) if recurrence else None)
+                             for event_id, start, end, recurrence in inserted)
+        change_id = None
+        if spans:
+            bump_data_version(db.session.connection())
+            change_id = record_bulk_change(db.session.connection(), 'events', len(spans))
+        return spans, change_id, rejected
+
+    # Rejections are reported once the transaction is through, since a retry repeats the checks
+    spans, change_id, rejected = in_write_transaction(insert_events)
+    for line, message in rejected:
+        reject(line, message)
+    if change_id:
+        apply_own_bulk_change(change_id, event_spans=spans)
+    return len(spans)
+
+def import_resources_chunk(chunk, reject, default_user_id):
+    prepared = []
+    for line, row in chunk:
+        try:
+            if row is None:
+                raise ValueError('Not a JSON object.')
+            values = {'resource_name': required_text(row, 'resource_name'), 'resource_type': required_text(row, 'resource_type')}
+            resource_id = optional_id(row, 'resource_id')
+            if resource_id:
+                values['resource_id'] = resource_id
+        except ValueError as e:
+            reject(line, str(e))
+            continue
+        prepared.append((line, values))
+
+    if not prepared:
+        return 0
+
+    def insert_resources():
+        rejected = []
+        taken_names = {name for (name,) in db.session.query(Resource.resource_name).filter(
+            Resource.resource_name.in_({v['resource_name'] for _, v in prepared}))}
+        taken_ids = {resource_id for (resource_id,) in db.session.query(Resource.resource_id).filter(
+            Resource.resource_id.in_({v['resource_id'] for _, v in prepared if 'resource_id' in v}))}
+        with_ids, without_ids = [], []
+        for line, values in prepared:
+            if values['resource_name'] in taken_names:
+                rejected.append((line, f'Resource {values["resource_name"]!r} already exists.'))
+            elif values.get('resource_id') in taken_ids:
+                rejected.append((line, f'Resource {values["resource_id"]} already exists.'))
+            else:
+                taken_names.add(values['resource_name'])
+                if 'resource_id' in values:
+                    taken_ids.add(values['resource_id'])
+                    with_ids.append(values)
+                else:
+                    without_ids.append(values)
+
+        for batch in (with_ids, without_ids):
+            if batch:
+                db.session.execute(sa.insert(Resource.__table__), batch)
+        imported = len(with_ids) + len(without_ids)
+        if imported:
+            bump_data_version(db.session.connection())
+            record_bulk_change(db.session.connection(), 'resources', imported)
+        return imported, rejected
+
+    imported, rejected = in_write_transaction(insert_resources)
+    for line, message in rejected:
+        reject(line, message)
+    return imported
+
+def import_allocations_chunk(chunk, reject, default_user_id):
+    prepared = []
+    for line, row in chunk:
+        try:
+            if row is None:
+                raise ValueError('Not a JSON object.')
+            event_id, resource_id = optional_id(row, 'event_id'), optional_id(row, 'resource_id')
+            if event_id is None or resource_id is None:
+                raise ValueError('Missing event_id or resource_id.')
+        except ValueError as e:
+            reject(line, str(e))
+            continue
+        prepared.append((line, event_id, resource_id))
+
+    if not prepared:
+        return 0
+
+    def insert_allocations():
+        # Checked and inserted under the write lock, so concurrent writers can't add the same pair
+        # or an overlapping booking in between; the interval index is exact while it is held
+        rejected = []
+        event_ids = {event_id for _, event_id, _ in prepared}
+        resource_ids = {resource_id for _, _, resource_id in prepared}
+        spans = {}
+        for event_id, start, end, recurrence in db.session.query(
+                Event.event_id, Event.start_time, Event.end_time, Event.recurrence).filter(Event.event_id.in_(event_ids)):
+            spans[event_id] = (start, end, Series(recurrence, start, end) if recurrence else None)
+        known_resources = {resource_id for (resource_id,) in db.session.query(Resource.resource_id).filter(Resource.resource_id.in_(resource_ids))}
+        # Filter on event_id only so SQLite uses that index rather than scanning whole resources
+        taken = {(event_id, resource_id) for event_id, resource_id in db.session.query(
+            EventResourceAllocation.event_id, EventResourceAllocation.resource_id
+        ).filter(EventResourceAllocation.event_id.in_(event_ids))}
+
+        # The same no-overlap rule as /allocate, against existing bookings and rows accepted earlier in the chunk
+        index = get_resource_index()
+        chunk_index = ResourceIntervalIndex()
+        chunk_index.load(((event_id,) + span for event_id, span in spans.items()), [])
+        windows = {}
+        accepted = []
+        for line, event_id, resource_id in prepared:
+            if event_id not in spans:
+                rejected.append((line, f'Unknown event_id {event_id}.'))
                 continue
-            if end_date and event.start_time > end_date:
+            if resource_id not in known_resources:
+                rejected.append((line, f'Unknown resource_id {resource_id}.'))
                 continue
+            if (event_id, resource_id) in taken:
+                rejected.append((line, f'Resource {resource_id} is already allocated to event {event_id}.'))
+                continue
+            if event_id not in windows:
+                windows[event_id] = occurrence_windows(*spans[event_id])
+            clashes = sorted({hit_id for start, end in windows[event_id] for booked in (index, chunk_index)
+                              for hit_id in booked.overlapping(resource_id, start, end, event_id)})
+            if clashes:
+                rejected.append((line, f'Resource {resource_id} is already booked at that time by event {clashes[0]}.'))
+                continue
+            taken.add((event_id, resource_id))
+            chunk_index.add_allocation(event_id, resource_id)
+            accepted.append({'event_id': event_id, 'resource_id': resource_id})
+        if not accepted:
+            return accepted, None, rejected
+
+        db.session.execute(sa.insert(EventResourceAllocation.__table__), accepted)
+        # Add the new hours to the daily rollup in the same transaction
+        usage = {}
+        for allocation in accepted:
+            start, end, series = spans[allocation['event_id']]
+            if series is not None:
+                continue # Expanded at report time rather than rolled up
+            for day, hours in split_hours_by_day(start, end):
+                key = (allocation['resource_id'], day)
+                usage[key] = usage.get(key, 0) + hours
+        upsert = sqlite_insert(ResourceDailyUsage.__table__)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['resource_id', 'day'], set_={'hours': ResourceDailyUsage.__table__.c.hours + upsert.excluded.hours}
+        )
+        if usage:
+            db.session.execute(upsert, [{'resource_id': r, 'day': day, 'hours': hours} for (r, day), hours in usage.items()])
+        bump_data_version(db.session.connection())
+        change_id = record_bulk_change(db.session.connection(), 'allocations', len(accepted))
+        return accepted, change_id, rejected
+
+    accepted, change_id, rejected = in_write_transaction(insert_allocations)
+    for line, message in rejected:
+        reject(line, message)
+    if change_id:
+        apply_own_bulk_change(change_id, allocations=[(a['event_id'], a['resource_id']) for a in accepted])
+    return len(accepted)
+
+IMPORTERS = {'events': import_events_chunk, 'resources': import_resources_chunk, 'allocations': import_allocations_chunk}
+
+def import_rows(kind, rows, default_user_id=None, chunk_size=5000, max_errors=100):
+    """
+    Imports (line_number, row) pairs of the given kind in chunked batch inserts, one transaction per chunk.
+    Invalid rows are skipped and reported. Returns {'imported': n, 'failed': n, 'errors': [...]}, plus
+    'error' if the database stayed locked and the import stopped early.
+    """
+    result = {'imported': 0, 'failed': 0, 'errors': []}
 
-            # Calculate overlap for total hours utilized
-            if start_date and end_date:
-                overlap_start = max(event.start_time, start_date)
-                overlap_end = min(event.end_time, end_date)
-            elif start_date:
-                overlap_start = max(event.start_time, start_date)
-                overlap_end = event.end_time
-            elif end_date:
-                overlap_start = event.start_time
-                overlap_end = min(event.end_time, end_date)
-            else:
-                overlap_start = event.start_time
-                overlap_end = event.end_time
-
-            if overlap_start < overlap_end:
-                duration = (overlap_end - overlap_start).total_seconds() / 3600
-                total_hours_utilized += duration
+    def reject(line, message):
+        result['failed'] += 1
+        if len(result['errors']) < max_errors:
+            result['errors'].append({'line': line, 'error': message})
 
-            # Upcoming bookings (from now onwards)
-            if event.end_time > datetime.now():
-                upcoming_bookings.append(event)
+    if kind == 'allocations':
+        ensure_daily_usage()
+    for chunk in chunked(rows, chunk_size):
+        try:
+            result['imported'] += IMPORTERS[kind](chunk, reject, default_user_id)
+        except RetriesExhausted:
+            # Earlier chunks are committed, so say where to resume from
+            result['error'] = f'The database stayed busy; the import stopped before line {chunk[0][0]}.'
+            break
+    return result
+
+def export_rows(kind, fmt):
+    """Streams every row of the given kind as CSV or JSONL text chunks."""
+    model = EXPORT_MODELS[kind]
+    columns = EXPORT_COLUMNS[kind]
+    rows = db.session.execute(
+        sa.select(*(getattr(model, column) for column in columns)).order_by(getattr(model, columns[0]))
+        .execution_options(yield_per=5000)
+    )
+    return write_rows(rows, columns, fmt)
 
-        report_data.append({
-            'resource_name': resource.resource_name,
-            'resource_type': resource.resource_type,
-            'total_hours_utilized': round(total_hours_utilized, 2),
-            'upcoming_bookings': upcoming_bookings
-        })
+@app.route('/data/export/<kind>')
+@login_required
+def export_data(kind):
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORT_COLUMNS or fmt not in FORMATS:
+        abort(404)
+    return Response(
+        stream_with_context(export_rows(kind, fmt)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'}
+    )
 
-    return render_template('resource_utilization_report.html', report_data=report_data, start_date=start_date, end_date=end_date)
+@app.route('/data/import/<kind>', methods=['POST'])
+@login_required
+def import_data(kind):
+    if kind not in IMPORTERS:
+        abort(404)
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'No file uploaded.'}), 400
+    fmt = request.form.get('format') or detect_format(file.filename)
+    if fmt not in FORMATS:
+        return jsonify({'error': f'Unsupported format {fmt!r}.'}), 400
+    stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    result = import_rows(kind, read_rows(stream, fmt), default_user_id=session['user_id'])
+    if 'error' in result:
+        return jsonify(result), 503, {'Retry-After': '1'}
+    return jsonify(result)
+
+data_cli = AppGroup('data', help='Bulk import and export of events, resources and allocations.')
+app.cli.add_command(data_cli)
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(list(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--user', 'username', help='Owner of imported events that have no user_id.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per insert batch and transaction.')
+def data_import_command(kind, path, fmt, username, chunk_size):
+    """Import events, resources or allocations from a CSV or JSONL file."""
+    default_user_id = None
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'No user named {username!r}.')
+        default_user_id = user.id
+    with open(path, newline='', encoding='utf-8') as stream:
+        result = import_rows(kind, read_rows(stream, fmt or detect_format(path)), default_user_id, chunk_size)
+    click.echo(f'Imported {result["imported"]} {kind}; {result["failed"]} rows failed.')
+    for error in result['errors']:
+        click.echo(f'  line {error["line"]}: {error["error"]}')
+    if 'error' in result:
+        raise click.ClickException(result['error'])
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(list(EXPORT_COLUMNS)))
+@click.argument('output', type=click.File('w'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension, or csv.')
+def data_export_command(kind, output, fmt):
+    """Export events, resources or allocations to a CSV or JSONL file (stdout by default)."""
+    for chunk in export_rows(kind, fmt or detect_format(output.name)):
+        output.write(chunk)
+
+@data_cli.command('generate')
+@click.option('--users', default=50, show_default=True, type=click.IntRange(min=1))
+@click.option('--events', default=10000, show_default=True)
+@click.option('--resources', default=200, show_default=True)
+@click.option('--density', default=1.5, show_default=True, help='Average resources allocated per event.')
+@click.option('--days', default=90, show_default=True, help='Days the events are spread over, starting 30 days ago.')
+@click.option('--seed', default=0, show_default=True)
+def data_generate_command(users, events, resources, density, days, seed):
+    """Seed a reproducible synthetic dataset for load testing."""
+    counts = generate_synthetic_data(users, events, resources, density, days, seed=seed)
+    click.echo(', '.join(f'{count} {table}' for table, count in counts.items()) + ' created.')
+
+
+def generate_synthetic_data(users=50, events=10000, resources=200, allocations_per_event=1.5,
+                            days=90, start=None, seed=0, chunk_size=5000):
+    """
+    Seeds a reproducible synthetic dataset for load testing: users (all with password 'password'),
+    events spread over `days` from `start` (defaults to 30 days ago, so there is past and upcoming
+    data), resources, and on average `allocations_per_event` conflict-free bookings per event.
+    Rows are added after any existing data; returns the number of rows inserted per table.
+    """
+    rng = random.Random(seed)
+    start = start or (datetime.now() - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    first_event = (db.session.query(db.func.max(Event.event_id)).scalar() or 0) + 1
+    first_resource = (db.session.query(db.func.max(Resource.resource_id)).scalar() or 0) + 1
+    resource_types = ['room', 'instructor', 'equipment']
+
+    password_hash = generate_password_hash('password', method=app.config['PASSWORD_HASH_METHOD']) # Hashing is slow; every user shares one
+    user_rows = [{'id': first_user + i, 'username': f'user{first_user + i}', 'password_hash': password_hash,
+                  'profile_pic': 'default_profile_pic.png'} for i in range(users)]
+    resource_rows = [{'resource_id': first_resource + i, 'resource_name': f'Resource {first_resource + i}',
+                      'resource_type': resource_types[i % len(resource_types)]} for i in range(resources)]
+    for table, rows in ((User.__table__, user_rows), (Resource.__table__, resource_rows)):
+        for batch in chunked(rows, chunk_size):
+            db.session.execute(sa.insert(table), batch)
+
+    # Start times on 15-minute boundaries, generated in order so each resource's
+    # bookings can be kept conflict-free by tracking when it next becomes free
+    slots = days * 24 * 4
+    starts = sorted(rng.randrange(slots) for _ in range(events))
+    free_from = {resource_id: start for resource_id in range(first_resource, first_resource + resources)}
+    whole, fraction = divmod(allocations_per_event, 1)
+    event_rows, allocation_rows = [], []
+    for i, slot in enumerate(starts):
+        event_id = first_event + i
+        start_time = start + timedelta(minutes=15 * slot)
+        end_time = start_time + timedelta(minutes=15 * rng.randint(2, 16))
+        event_rows.append({'event_id': event_id, 'user_id': first_user + rng.randrange(users),
+                           'title': f'Event {event_id}', 'start_time': start_time, 'end_time': end_time,
+                           'description': None})
+        wanted = int(whole) + (rng.random() < fraction)
+        for resource_id in rng.sample(list(free_from), min(wanted * 3, resources)):
+            if not wanted:
+                break
+            if free_from[resource_id] <= start_time:
+                allocation_rows.append({'event_id': event_id, 'resource_id': resource_id})
+                free_from[resource_id] = end_time
+                wanted -= 1
+    for table, rows in ((Event.__table__, event_rows), (EventResourceAllocation.__table__, allocation_rows)):
+        for batch in chunked(rows, chunk_size):
+            db.session.execute(sa.insert(table), batch)
+    bump_data_version(db.session.connection())
+    record_bulk_change(db.session.connection(), 'synthetic', len(event_rows) + len(allocation_rows))
+    db.session.commit()
 
+    # Core inserts bypass the session hooks, so rebuild the rollup; the interval index reloads on the logged change
+    rebuild_daily_usage()
+    return {'users': len(user_rows), 'events': len(event_rows), 'resources': len(resource_rows),
+            'allocations': len(allocation_rows)}
 
 def create_sample_data():
     from app import db, app, User, Resource, Event, EventResourceAllocation # Import inside function to avoid circular imports
@@ -488,9 +2277,62 @@ def create_sample_data():
 
         print("Sample data created!")
 
+def create_missing_columns(connection):
+    # create_all() doesn't alter existing tables, so add nullable columns introduced since separately
+    inspector = sa.inspect(connection)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                connection.execute(sa.text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+                ))
+
+def remove_duplicate_allocations(connection):
+    """
+    Deletes repeated (event, resource) allocations, keeping the oldest, so the unique index can
+    be created on databases from before it existed. Returns the number of rows removed.
+    """
+    existing = {index['name'] for index in sa.inspect(connection).get_indexes(EventResourceAllocation.__tablename__)}
+    if 'ix_allocation_event_resource' in existing:
+        return 0
+    keep = sa.select(sa.func.min(EventResourceAllocation.allocation_id)).group_by(
+        EventResourceAllocation.event_id, EventResourceAllocation.resource_id)
+    return connection.execute(
+        sa.delete(EventResourceAllocation).where(EventResourceAllocation.allocation_id.notin_(keep))
+    ).rowcount
+
+def create_missing_indexes(connection):
+    # create_all() skips tables that already exist, so add indexes introduced since separately
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def upgrade_database():
+    """
+    Creates missing tables, columns and indexes, so databases from older versions work with every
+    entry point (python app.py, flask commands, gunicorn). Runs when the app is imported; the write
+    transaction keeps worker processes starting together from upgrading at the same time.
+    """
+    def upgrade():
+        connection = db.session.connection()
+        db.metadata.create_all(connection)
+        create_missing_columns(connection)
+        removed = remove_duplicate_allocations(connection)
+        create_missing_indexes(connection)
+        return removed
+
+    if in_write_transaction(upgrade):
+        # Core deletes bypass the session hooks; duplicates were counted twice in the rollup
+        rebuild_daily_usage()
+        resource_index.loaded = False
+
+with app.app_context():
+    upgrade_database()
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        # Run this once to create sample data. Comment out after first run.
-        # create_sample_data()
+    # Run this once to create sample data. Comment out after first run.
+    # create_sample_data()
     app.run(debug=True)
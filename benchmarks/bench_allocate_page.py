@@ -0,0 +1,90 @@
+"""
+Benchmark and query-count guard for the /allocate page.
+
+Renders the page at growing table sizes and asserts the number of SQL queries
+per request stays at or below MAX_QUERIES regardless of size.
+
+Usage: python benchmarks/bench_allocate_page.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_allocate_page.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa  # noqa: E402
+from app import app, db, User, Event, Resource, EventResourceAllocation  # noqa: E402
+
+MAX_QUERIES = 5 # events picker, resources picker, allocations page, navbar user (+1 spare)
+SIZES = [100, 1000, 10000, 50000]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        sa.event.listen(db.engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+def grow_to(size, user_id, start_id):
+    base = datetime.now() - timedelta(days=30)
+    events = [{'event_id': i, 'user_id': user_id, 'title': f'Event {i}',
+               'start_time': base + timedelta(hours=i), 'end_time': base + timedelta(hours=i, minutes=45)}
+              for i in range(start_id, size + 1)]
+    resources = [{'resource_id': i, 'resource_name': f'Resource {i}', 'resource_type': 'room'} for i in range(start_id, size + 1)]
+    allocations = [{'event_id': i, 'resource_id': i} for i in range(start_id, size + 1)]
+    db.session.execute(db.insert(Event), events)
+    db.session.execute(db.insert(Resource), resources)
+    db.session.execute(db.insert(EventResourceAllocation), allocations)
+    db.session.commit()
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        counter = QueryCounter()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    seeded = 0
+    for size in SIZES:
+        with app.app_context():
+            grow_to(size, user_id, seeded + 1)
+        seeded = size
+
+        client.get('/allocate') # warm up
+        counter.count = 0
+        runs = 20
+        started = time.perf_counter()
+        for _ in range(runs):
+            response = client.get('/allocate')
+            assert response.status_code == 200
+        elapsed = (time.perf_counter() - started) / runs
+        queries = counter.count / runs
+
+        search_started = time.perf_counter()
+        client.get('/events/search?q=Event%2012')
+        search_elapsed = time.perf_counter() - search_started
+
+        print(f'{size:>6} rows  /allocate {elapsed * 1000:7.1f} ms  {queries:.0f} queries  '
+              f'/events/search {search_elapsed * 1000:6.1f} ms')
+        assert queries <= MAX_QUERIES, f'/allocate ran {queries} queries with {size} rows (limit {MAX_QUERIES})'
+    print(f'Query count stayed within {MAX_QUERIES} per request.')
+
+
+if __name__ == '__main__':
+    main()
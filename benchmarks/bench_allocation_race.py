@@ -0,0 +1,171 @@
+"""
+Stress test: many worker processes and threads allocate resources to overlapping events at
+once, then the database is checked for double bookings (two overlapping events holding one
+resource) and duplicate rows. Runs the old check-then-insert logic ("naive") and the /allocate
+route ("locked"), and reports throughput for each.
+
+Worker processes stand in for several server workers. The naive run checks and inserts without
+holding the write lock, so two workers can both pass the check before either commits. The locked run goes through
+the whole request (session, conflict suggestions), so its throughput includes more than locking.
+
+Usage: python benchmarks/bench_allocation_race.py [processes] [threads] [attempts_per_thread]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES = 5
+SLOTS = 40 # Separate hours; all events in one slot overlap each other
+EVENTS_PER_SLOT = 8
+
+
+def configure(db_path):
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    os.environ['FLASK_SESSION_STORE_PATH'] = db_path + '.sessions'
+    os.environ['FLASK_RESPONSE_CACHE_ENABLED'] = 'false'
+    os.environ.setdefault('FLASK_DATABASE_PROFILE', 'production')
+    sys.path.insert(0, ROOT)
+
+
+def setup(db_path):
+    configure(db_path)
+    from app import app, db, User, Resource, Event
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password_hash='-')
+        db.session.add(user)
+        db.session.add_all(Resource(resource_name=f'Room {i}', resource_type='room') for i in range(RESOURCES))
+        db.session.flush()
+        start = datetime(2025, 1, 6, 8)
+        for slot in range(SLOTS):
+            slot_start = start + timedelta(hours=slot)
+            db.session.add_all(Event(title=f'Slot {slot} event {i}', start_time=slot_start,
+                                     end_time=slot_start + timedelta(minutes=50), user_id=user.id)
+                               for i in range(EVENTS_PER_SLOT))
+        db.session.commit()
+
+
+def naive_allocate(event_id, resource_id):
+    # The allocation logic from before the write transaction: check, then insert
+    from app import db, Event, EventResourceAllocation, check_resource_conflict
+    event = db.session.get(Event, event_id)
+    if check_resource_conflict(resource_id, event.start_time, event.end_time, event.event_id, event.series):
+        return 'conflict'
+    if EventResourceAllocation.query.filter_by(event_id=event_id, resource_id=resource_id).first():
+        return 'exists'
+    db.session.add(EventResourceAllocation(event_id=event_id, resource_id=resource_id))
+    db.session.commit()
+    return 'allocated'
+
+
+def route_outcome(client):
+    # Read the outcome of /allocate from the first message it flashed
+    with client.session_transaction() as session:
+        category, message = session['_flashes'][0]
+    if category == 'success':
+        return 'allocated'
+    if category == 'danger':
+        return 'conflict'
+    return 'exists' if message.startswith('Resource already') else 'busy'
+
+
+def worker(db_path, mode, threads, attempts, seed, results):
+    configure(db_path)
+    import sqlalchemy as sa
+    from app import app
+
+    counts = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def run(thread_number):
+        rng = random.Random(seed * 1000 + thread_number)
+        barrier.wait()
+        for _ in range(attempts):
+            event_id = rng.randint(1, SLOTS * EVENTS_PER_SLOT)
+            resource_id = rng.randint(1, RESOURCES)
+            if mode == 'naive':
+                with app.app_context():
+                    try:
+                        outcome = naive_allocate(event_id, resource_id)
+                    except sa.exc.IntegrityError:
+                        outcome = 'duplicate_rejected'
+                    except sa.exc.OperationalError:
+                        outcome = 'busy'
+            else:
+                client = app.test_client() # A fresh session each time, as a browser following the redirect clears its flashes
+                response = client.post('/allocate', data={'event_id': event_id, 'resource_id': resource_id})
+                outcome = 'error' if response.status_code >= 500 else route_outcome(client)
+            with lock:
+                counts[outcome] = counts.get(outcome, 0) + 1
+
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def audit(db_path):
+    import sqlite3
+    connection = sqlite3.connect(db_path)
+    allocations = connection.execute('SELECT COUNT(*) FROM event_resource_allocation').fetchone()[0]
+    duplicates = connection.execute(
+        'SELECT COUNT(*) FROM (SELECT 1 FROM event_resource_allocation GROUP BY event_id, resource_id HAVING COUNT(*) > 1)'
+    ).fetchone()[0]
+    double_bookings = connection.execute('''
+        SELECT COUNT(*) FROM event_resource_allocation a
+        JOIN event_resource_allocation b ON a.resource_id = b.resource_id AND a.event_id < b.event_id
+        JOIN event ea ON ea.event_id = a.event_id
+        JOIN event eb ON eb.event_id = b.event_id
+        WHERE ea.start_time < eb.end_time AND eb.start_time < ea.end_time
+    ''').fetchone()[0]
+    return allocations, duplicates, double_bookings
+
+
+def run_mode(mode, processes, threads, attempts):
+    db_path = os.path.join(tempfile.mkdtemp(), f'race_{mode}.db')
+    context = multiprocessing.get_context('spawn') # A fresh app, engine and interval index per process
+    loader = context.Process(target=setup, args=(db_path,))
+    loader.start()
+    loader.join()
+    results = context.Queue()
+    workers = [context.Process(target=worker, args=(db_path, mode, threads, attempts, n, results)) for n in range(processes)]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    counts = {}
+    for _ in workers:
+        for outcome, count in results.get().items():
+            counts[outcome] = counts.get(outcome, 0) + count
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - started
+    allocations, duplicates, double_bookings = audit(db_path)
+    total = processes * threads * attempts
+    print(f'{mode:>6}: {total} attempts in {elapsed:5.1f}s ({total / elapsed:6.0f}/s incl. process start)  '
+          f'{allocations} allocated of {SLOTS * RESOURCES} possible  double bookings {double_bookings}  '
+          f'duplicate rows {duplicates}  outcomes {counts}')
+    return double_bookings + duplicates
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    attempts = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    print(f'{processes} processes x {threads} threads x {attempts} attempts; {SLOTS} slots of {EVENTS_PER_SLOT} '
+          f'overlapping events, {RESOURCES} resources')
+    run_mode('naive', processes, threads, attempts)
+    if run_mode('locked', processes, threads, attempts):
+        sys.exit('Double bookings or duplicates with the write transaction')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: the /availability occupancy matrix for many resources over a month of
+15-minute buckets (one range query plus a bitset fill per resource), against
+answering each cell with its own overlap query, timed on a sample of cells.
+
+Usage: python benchmarks/bench_availability.py [resources] [events] [days]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_availability.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_ENABLED'] = 'false'
+os.environ['FLASK_INSTRUMENTATION_ENABLED'] = 'true'
+os.environ['FLASK_INSTRUMENTATION_LOG'] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, Event, EventResourceAllocation, generate_synthetic_data  # noqa: E402
+
+SAMPLE_CELLS = 2000
+
+
+def main():
+    resources = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 40000
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 31
+    start = datetime(2025, 1, 1)
+    with app.app_context():
+        db.create_all()
+        generate_synthetic_data(users=50, events=events, resources=resources, days=days, start=start)
+
+    client = app.test_client()
+    query = f'start={start:%Y-%m-%d}&end={start + timedelta(days=days):%Y-%m-%d}'
+    print(f'{resources} resources, {events} events over {days} days')
+    for granularity in ('15min', 'hour', 'day'):
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            response = client.get(f'/availability?{query}&granularity={granularity}')
+            timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.data
+        data = response.get_json()
+        print(f'{granularity:>6}: {len(data["resources"]) * data["buckets"]:9d} cells  best {min(timings):7.1f} ms  '
+              f'{int(response.headers["X-Query-Count"])} queries  {len(response.data) / 1024:7.0f} KB')
+
+    # Baseline: one overlap query per (resource, 15-minute bucket), extrapolated from a sample
+    cells = resources * days * 96
+    bucket = timedelta(minutes=15)
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(SAMPLE_CELLS):
+            cell_start = start + (i % (days * 96)) * bucket
+            db.session.query(EventResourceAllocation.allocation_id).join(Event).filter(
+                EventResourceAllocation.resource_id == i % resources + 1,
+                Event.start_time < cell_start + bucket, Event.end_time > cell_start
+            ).first()
+        per_cell_ms = (time.perf_counter() - started) * 1000 / SAMPLE_CELLS
+    print(f'per-cell queries: {per_cell_ms:.3f} ms each, about {per_cell_ms * cells / 1000:.0f} s for {cells} cells')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: allocation throughput of POST /allocate/bulk vs. one POST /allocate per pair.
+
+Usage: python benchmarks/bench_bulk_allocate.py [pairs]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_bulk_allocate.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, User, Event, Resource, EventResourceAllocation  # noqa: E402
+
+ROOMS = 20
+
+
+def seed(pairs):
+    # Two identical schedules (one per path), each with sessions spread over ROOMS rooms without overlaps
+    user = User(username='bench')
+    user.password_hash = 'x'
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Resource), [
+        {'resource_id': r, 'resource_name': f'Room {r}', 'resource_type': 'room'} for r in range(1, 2 * ROOMS + 1)
+    ])
+    base = datetime(2030, 1, 1, 8, 0)
+    events = []
+    schedules = ([], [])
+    for path in range(2):
+        for i in range(pairs):
+            event_id = path * pairs + i + 1
+            start = base + timedelta(hours=i // ROOMS)
+            events.append({'event_id': event_id, 'user_id': user.id, 'title': f'Session {event_id}',
+                           'start_time': start, 'end_time': start + timedelta(minutes=50)})
+            schedules[path].append((event_id, path * ROOMS + i % ROOMS + 1))
+    db.session.execute(db.insert(Event), events)
+    db.session.commit()
+    return schedules
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with app.app_context():
+        db.create_all()
+        single, bulk = seed(pairs)
+    client = app.test_client()
+
+    started = time.perf_counter()
+    for event_id, resource_id in single:
+        client.post('/allocate', data={'event_id': event_id, 'resource_id': resource_id})
+    single_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post('/allocate/bulk', json={
+        'allocations': [{'event_id': event_id, 'resource_id': resource_id} for event_id, resource_id in bulk]
+    })
+    bulk_time = time.perf_counter() - started
+    assert response.get_json()['allocated'] == pairs, response.get_json()
+
+    with app.app_context():
+        assert EventResourceAllocation.query.count() == 2 * pairs
+    print(f'single /allocate  {pairs} pairs in {single_time:.2f}s ({pairs / single_time:,.0f} allocations/s)')
+    print(f'/allocate/bulk    {pairs} pairs in {bulk_time:.2f}s ({pairs / bulk_time:,.0f} allocations/s)')
+    print(f'speed-up          {single_time / bulk_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
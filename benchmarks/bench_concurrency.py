@@ -0,0 +1,104 @@
+"""
+Concurrency load test: N worker processes (like gunicorn workers) reading and writing
+the same SQLite database, once with the default database profile and once with the
+production profile (WAL, tuned pragmas, pooling).
+
+Each worker loops for a fixed time doing mostly reads (GET /events) with some writes
+(POST /events/add, POST /allocate) and counts successful requests and failures
+such as "database is locked".
+
+Usage: python benchmarks/bench_concurrency.py [workers] [seconds] [write_percent]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(db_path, profile):
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    os.environ['FLASK_SESSION_STORE_PATH'] = db_path + '.sessions'
+    os.environ['FLASK_RESPONSE_CACHE_PATH'] = db_path + '.cache'
+    os.environ['FLASK_DATABASE_PROFILE'] = profile
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    app_module.app.logger.disabled = True # Failed requests are counted, not logged
+    return app_module
+
+
+def setup(db_path, profile):
+    app_module = load_app(db_path, profile)
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        user = app_module.User(username='load')
+        user.set_password('load')
+        app_module.db.session.add(user)
+        app_module.db.session.add_all(app_module.Resource(resource_name=f'Room {i}', resource_type='room') for i in range(20))
+        app_module.db.session.commit()
+
+
+def worker(db_path, profile, seconds, write_percent, seed, results):
+    app_module = load_app(db_path, profile)
+    client = app_module.app.test_client()
+    client.post('/login', data={'username': 'load', 'password': 'load'})
+    rng = random.Random(seed)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.randrange(100) < write_percent:
+                start = datetime(2030, 1, 1) + timedelta(minutes=15 * rng.randrange(100000))
+                response = client.post('/events/add', data={
+                    'title': f'Load {seed}', 'description': '',
+                    'start_time': start.isoformat(timespec='minutes'),
+                    'end_time': (start + timedelta(minutes=45)).isoformat(timespec='minutes')
+                })
+                if response.status_code < 400:
+                    response = client.post('/allocate', data={'event_id': rng.randint(1, 50), 'resource_id': rng.randint(1, 20)})
+                kind = 'writes'
+            else:
+                response = client.get('/events')
+                kind = 'reads'
+            # 404s and conflict redirects are expected; server errors such as "database is locked" are not
+            counts[kind if response.status_code < 500 else 'errors'] += 1
+        except Exception:
+            counts['errors'] += 1
+    results.put(counts)
+
+
+def run(profile, workers, seconds, write_percent):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_concurrency.db')
+    context = multiprocessing.get_context('spawn')
+    setup_process = context.Process(target=setup, args=(db_path, profile))
+    setup_process.start()
+    setup_process.join()
+
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(db_path, profile, seconds, write_percent, i, results)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+    print(f'{profile:<11} {workers} workers  reads {totals["reads"] / seconds:8.1f}/s  '
+          f'writes {totals["writes"] / seconds:7.1f}/s  errors {totals["errors"]}')
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    write_percent = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    for profile in ('default', 'production'):
+        run(profile, workers, seconds, write_percent)
+
+
+if __name__ == '__main__':
+    main()
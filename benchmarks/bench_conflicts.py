@@ -0,0 +1,102 @@
+"""
+Benchmark: resource conflict checks via the interval index vs. the original SQL query.
+
+Usage: python benchmarks/bench_conflicts.py [bookings_per_resource] [resources]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_conflicts.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, User, Event, Resource, EventResourceAllocation, get_resource_index, check_resources_conflicts  # noqa: E402
+
+
+def sql_conflicts(resource_id, new_start_time, new_end_time, event_id=None):
+    # The original join-and-filter implementation of check_resource_conflict
+    query = EventResourceAllocation.query.filter_by(resource_id=resource_id).join(Event).filter(
+        Event.end_time > new_start_time,
+        Event.start_time < new_end_time
+    )
+    if event_id:
+        query = query.filter(Event.event_id != event_id)
+    return query.all()
+
+
+def seed(bookings_per_resource, resource_count):
+    user = User(username='bench')
+    user.password_hash = 'x'
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(sa_insert(Resource), [
+        {'resource_id': r, 'resource_name': f'Resource {r}', 'resource_type': 'room'} for r in range(1, resource_count + 1)
+    ])
+    base = datetime(2025, 1, 1, 8, 0)
+    events, allocations = [], []
+    event_id = 0
+    for resource_id in range(1, resource_count + 1):
+        for i in range(bookings_per_resource):
+            event_id += 1
+            start = base + timedelta(hours=2 * i)
+            events.append({'event_id': event_id, 'user_id': user.id, 'title': f'Event {event_id}',
+                           'start_time': start, 'end_time': start + timedelta(hours=1)})
+            allocations.append({'event_id': event_id, 'resource_id': resource_id})
+    db.session.execute(sa_insert(Event), events)
+    db.session.execute(sa_insert(EventResourceAllocation), allocations)
+    db.session.commit()
+    return base
+
+
+def sa_insert(model):
+    return db.insert(model)
+
+
+def timed(label, fn, queries):
+    started = time.perf_counter()
+    hits = sum(len(fn(*q)) for q in queries)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<16} {len(queries)} checks in {elapsed:.3f}s '
+          f'({elapsed / len(queries) * 1e6:.1f} us/check, {hits} conflicts found)')
+    return hits
+
+
+def main():
+    bookings_per_resource = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    resource_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with app.app_context():
+        db.create_all()
+        base = seed(bookings_per_resource, resource_count)
+        print(f'{bookings_per_resource * resource_count} bookings over {resource_count} resources')
+
+        started = time.perf_counter()
+        get_resource_index()
+        print(f'index build      {time.perf_counter() - started:.3f}s')
+
+        rng = random.Random(42)
+        span_hours = 2 * bookings_per_resource
+        queries = []
+        for _ in range(2000):
+            start = base + timedelta(minutes=rng.randrange(span_hours * 60))
+            queries.append((rng.randint(1, resource_count), start, start + timedelta(minutes=rng.choice([30, 90, 240]))))
+
+        sql_hits = timed('sql', sql_conflicts, queries)
+        index_hits = timed('interval index', lambda r, s, e: check_resources_conflicts([r], s, e).get(r, []), queries)
+        assert sql_hits == index_hits, 'interval index disagrees with the SQL query'
+        # The common allocate/edit path: no conflicts, so nothing is loaded from the database
+        timed('index lookup', lambda r, s, e: get_resource_index().overlapping(r, s, e), queries)
+
+        resource_ids = list(range(1, resource_count + 1))
+        multi = [(resource_ids, s, e) for _, s, e in queries[:500]]
+        timed('sql per resource', lambda rs, s, e: [a for r in rs for a in sql_conflicts(r, s, e)], multi)
+        timed('index all-in-one', lambda rs, s, e: [a for v in check_resources_conflicts(rs, s, e).values() for a in v], multi)
+
+
+if __name__ == '__main__':
+    main()
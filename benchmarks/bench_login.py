@@ -0,0 +1,104 @@
+"""
+Benchmark: login throughput, and latency of a cheap page (/resources) while a
+login storm is running, with password hashing bounded to a few workers vs.
+effectively unbounded (one hashing thread per concurrent login, as when
+hashing ran inline in every request thread).
+
+Usage: python benchmarks/bench_login.py [storm_threads] [seconds] [hash_workers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, generate_synthetic_data  # noqa: E402
+
+USERS = 200
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float('nan')
+
+
+def configure(hash_workers, max_pending):
+    app.config['PASSWORD_HASH_WORKERS'] = hash_workers
+    app.config['PASSWORD_HASH_MAX_PENDING'] = max_pending
+    executor = app.extensions.pop('password_executor', None)
+    if executor:
+        executor.shutdown()
+    app.extensions.pop('login_limiters', None)
+
+
+def run(storm_threads, seconds):
+    stop = threading.Event()
+    statuses = []
+    probe_latencies = []
+
+    def storm(worker):
+        client = app.test_client()
+        i = worker
+        while not stop.is_set():
+            # The test client keeps the session cookie, so log out to force a real password check
+            response = client.post('/login', data={'username': f'user{i % USERS + 1}', 'password': 'password'})
+            statuses.append(response.status_code)
+            client.get('/logout')
+            i += storm_threads
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/resources')
+            probe_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=storm, args=(n,)) for n in range(storm_threads)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    logins = sum(1 for status in statuses if status == 302)
+    return {
+        'logins_per_s': logins / seconds,
+        'rejected': sum(1 for status in statuses if status in (429, 503)),
+        'probe_p50': percentile(probe_latencies, 0.5),
+        'probe_p99': percentile(probe_latencies, 0.99),
+    }
+
+
+def main():
+    storm_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    hash_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    app.config['RESPONSE_CACHE_ENABLED'] = False # Measure the real page work
+    app.config['LOGIN_RATE_LIMIT_PER_USERNAME'] = app.config['LOGIN_RATE_LIMIT_PER_IP'] = 10 ** 9
+    with app.app_context():
+        db.create_all()
+        generate_synthetic_data(users=USERS, events=2000, resources=100)
+
+    print(f'{os.cpu_count()} CPUs, {storm_threads} concurrent logins for {seconds:g}s each, '
+          f'hashing {app.config["PASSWORD_HASH_METHOD"]}')
+    configure(1, 0)
+    idle = run(0, seconds)
+    print(f'{"no storm":34} {"":>10}  /resources p50 {idle["probe_p50"]:7.1f} ms  p99 {idle["probe_p99"]:7.1f} ms')
+    for label, workers in ((f'unbounded ({storm_threads} hashing threads)', storm_threads),
+                           (f'bounded ({hash_workers} hashing workers)', hash_workers)):
+        configure(workers, storm_threads)
+        result = run(storm_threads, seconds)
+        print(f'{label:34} {result["logins_per_s"]:6.1f} logins/s  /resources p50 {result["probe_p50"]:7.1f} ms  '
+              f'p99 {result["probe_p99"]:7.1f} ms  ({result["rejected"]} rejected)')
+
+
+if __name__ == '__main__':
+    main()
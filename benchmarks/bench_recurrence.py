@@ -0,0 +1,71 @@
+"""
+Benchmark: recurring events are stored once and expanded only inside the requested
+window, so listing a week, checking a booking or reporting on a month costs the same
+whether the window is next week or years into the series.
+
+Usage: python benchmarks/bench_recurrence.py [series] [resources]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_recurrence.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_ENABLED'] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, User, Event, Resource, EventResourceAllocation, build_utilization_report, check_resource_conflict  # noqa: E402
+from recurrence import WEEKDAYS  # noqa: E402
+
+
+def timed(fn, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    series_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    resources = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    base = datetime(2025, 1, 6) # A Monday
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(db.insert(Resource), [
+            {'resource_id': i, 'resource_name': f'Resource {i}', 'resource_type': 'room'} for i in range(1, resources + 1)
+        ])
+        # Open-ended weekly classes, each resource used by a few series in distinct time slots
+        for i in range(series_count):
+            start = base + timedelta(days=i % 5, hours=8 + (i // 5) % 10)
+            event = Event(title=f'Class {i}', start_time=start, end_time=start + timedelta(minutes=50), user_id=user.id)
+            event.set_recurrence(f'FREQ=WEEKLY;BYDAY={WEEKDAYS[start.weekday()]}')
+            db.session.add(event)
+            db.session.flush()
+            db.session.add(EventResourceAllocation(event_id=event.event_id, resource_id=i % resources + 1))
+        db.session.commit()
+        print(f'{series_count} open-ended weekly series on {resources} resources, stored as {Event.query.count()} rows')
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'x'})
+    for years_ahead in (0, 1, 5, 20):
+        week = base + timedelta(weeks=52 * years_ahead)
+        list_ms, response = timed(lambda: client.get(
+            f'/events?limit=100&start_date={week:%Y-%m-%d}&end_date={week + timedelta(days=6):%Y-%m-%d}'))
+        assert response.status_code == 200
+        with app.app_context():
+            probe = week + timedelta(hours=9)
+            check_ms, _ = timed(lambda: check_resource_conflict(1, probe, probe + timedelta(hours=1)))
+            report_ms, _ = timed(lambda: build_utilization_report(week, week + timedelta(days=30)), repeat=2)
+        print(f'{years_ahead:3d} years ahead: list week {list_ms:7.1f} ms   conflict check {check_ms:6.2f} ms   '
+              f'30-day report {report_ms:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark and equivalence check: build_utilization_report vs. the original per-resource loop.
+Also edits bookings through the ORM and verifies the daily rollup against a full recomputation.
+
+Usage: python benchmarks/bench_report.py [events] [resources]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_report.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, User, Event, Resource, EventResourceAllocation, build_utilization_report, verify_daily_usage  # noqa: E402
+
+
+def legacy_report(start_date, end_date, now):
+    # The original resource_utilization_report loop (N+1 queries, clipping in Python)
+    report_data = []
+    for resource in Resource.query.all():
+        total_hours_utilized = 0
+        upcoming_bookings = []
+        allocations = EventResourceAllocation.query.filter_by(resource_id=resource.resource_id).join(Event).all()
+        for allocation in allocations:
+            event = allocation.event
+            if start_date and event.end_time < start_date:
+                continue
+            if end_date and event.start_time > end_date:
+                continue
+            overlap_start = max(event.start_time, start_date) if start_date else event.start_time
+            overlap_end = min(event.end_time, end_date) if end_date else event.end_time
+            if overlap_start < overlap_end:
+                total_hours_utilized += (overlap_end - overlap_start).total_seconds() / 3600
+            if event.end_time > now:
+                upcoming_bookings.append(event)
+        report_data.append({
+            'resource_name': resource.resource_name,
+            'resource_type': resource.resource_type,
+            'total_hours_utilized': round(total_hours_utilized, 2),
+            'upcoming_bookings': upcoming_bookings
+        })
+    return report_data
+
+
+def seed(event_count, resource_count, rng):
+    user = User(username='bench')
+    user.password_hash = 'x'
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Resource), [
+        {'resource_id': r, 'resource_name': f'Resource {r}', 'resource_type': 'room'} for r in range(1, resource_count + 1)
+    ])
+    base = datetime(2024, 1, 1)
+    events, allocations = [], []
+    for event_id in range(1, event_count + 1):
+        start = base + timedelta(minutes=15 * rng.randrange(4 * 24 * 730))
+        events.append({'event_id': event_id, 'user_id': user.id, 'title': f'Event {event_id}',
+                       'start_time': start, 'end_time': start + timedelta(minutes=rng.choice([30, 45, 60, 90, 180, 1500]))})
+        for resource_id in rng.sample(range(1, resource_count + 1), rng.randint(0, min(3, resource_count))):
+            allocations.append({'event_id': event_id, 'resource_id': resource_id})
+    db.session.execute(db.insert(Event), events)
+    db.session.execute(db.insert(EventResourceAllocation), allocations)
+    db.session.commit()
+
+
+def mutate(rng, resource_count):
+    # Exercise the incremental rollup maintenance: move, delete and allocate through the session
+    event_count = Event.query.count()
+    for event in Event.query.filter(Event.event_id.in_(rng.sample(range(1, event_count + 1), 200))):
+        shift = timedelta(minutes=15 * rng.randint(-500, 500))
+        event.start_time += shift
+        event.end_time += shift + timedelta(minutes=15 * rng.randint(0, 8))
+    db.session.commit()
+    for event in Event.query.filter(Event.event_id.in_(rng.sample(range(1, event_count + 1), 50))):
+        for allocation in event.allocations:
+            db.session.delete(allocation)
+        db.session.delete(event)
+    db.session.commit()
+    remaining = [event_id for (event_id,) in db.session.query(Event.event_id)]
+    allocated = set(db.session.query(EventResourceAllocation.event_id, EventResourceAllocation.resource_id))
+    for event_id in rng.sample(remaining, 100):
+        # Only pairs not allocated yet; the unique (event, resource) index rejects the rest
+        free = [r for r in range(1, resource_count + 1) if (event_id, r) not in allocated]
+        if free:
+            db.session.add(EventResourceAllocation(event_id=event_id, resource_id=rng.choice(free)))
+    db.session.commit()
+
+
+def same_report(expected, actual):
+    if len(expected) != len(actual):
+        return False
+    for old, new in zip(expected, actual):
+        if (old['resource_name'], old['resource_type']) != (new['resource_name'], new['resource_type']):
+            return False
+        if abs(old['total_hours_utilized'] - new['total_hours_utilized']) > 0.011:
+            return False
+        if sorted(e.event_id for e in old['upcoming_bookings']) != sorted(e.event_id for e in new['upcoming_bookings']):
+            return False
+    return True
+
+
+def main():
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    resource_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(7)
+    now = datetime(2025, 3, 1, 12, 0)
+    ranges = [
+        (None, None),
+        (datetime(2025, 1, 1), None),
+        (None, datetime(2024, 6, 30, 23, 59, 59)),
+        (datetime(2024, 5, 1), datetime(2024, 5, 7, 23, 59, 59)),
+        (datetime(2024, 1, 1), datetime(2025, 12, 31, 23, 59, 59)),
+        (datetime(2024, 8, 3, 10, 30), datetime(2024, 8, 3, 16, 0)),
+        (datetime(2024, 8, 3, 10, 30), datetime(2024, 9, 14, 7, 15)),
+    ]
+    with app.app_context():
+        db.create_all()
+        seed(event_count, resource_count, rng)
+        print(f'{event_count} events over {resource_count} resources')
+        compare(ranges, now)
+        mutate(rng, resource_count)
+        mismatches = verify_daily_usage()
+        assert not mismatches, f'{len(mismatches)} rollup rows out of date after edits'
+        print('Rollup still matches after edits.')
+        compare(ranges, now)
+
+
+def compare(ranges, now):
+    for start_date, end_date in ranges:
+        db.session.expunge_all()
+        started = time.perf_counter()
+        expected = legacy_report(start_date, end_date, now)
+        legacy_time = time.perf_counter() - started
+
+        db.session.expunge_all()
+        started = time.perf_counter()
+        actual = build_utilization_report(start_date, end_date, now)
+        new_time = time.perf_counter() - started
+
+        assert same_report(expected, actual), f'report mismatch for range {start_date} - {end_date}'
+        print(f'{str(start_date):>19} .. {str(end_date):<19}  legacy {legacy_time:7.3f}s  engine {new_time:7.3f}s')
+    print('Reports match.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: /slots response time for many resources over a long search window.
+
+Usage: python benchmarks/bench_slots.py [resources] [bookings_per_resource]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_slots.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, User, Event, Resource, EventResourceAllocation  # noqa: E402
+
+BASE = datetime(2030, 1, 1)
+
+
+def seed(resource_count, bookings_per_resource, rng):
+    user = User(username='bench')
+    user.password_hash = 'x'
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Resource), [
+        {'resource_id': r, 'resource_name': f'Resource {r}', 'resource_type': 'room'} for r in range(1, resource_count + 1)
+    ])
+    events, allocations = [], []
+    for resource_id in range(1, resource_count + 1):
+        for _ in range(bookings_per_resource):
+            event_id = len(events) + 1
+            start = BASE + timedelta(minutes=30 * rng.randrange(2 * 24 * 365))
+            events.append({'event_id': event_id, 'user_id': user.id, 'title': f'Event {event_id}',
+                           'start_time': start, 'end_time': start + timedelta(minutes=rng.choice([30, 60, 90]))})
+            allocations.append({'event_id': event_id, 'resource_id': resource_id})
+    db.session.execute(db.insert(Event), events)
+    db.session.execute(db.insert(EventResourceAllocation), allocations)
+    db.session.commit()
+
+
+def main():
+    resource_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    bookings_per_resource = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with app.app_context():
+        db.create_all()
+        seed(resource_count, bookings_per_resource, random.Random(3))
+    client = app.test_client()
+    print(f'{resource_count * bookings_per_resource} bookings over {resource_count} resources, one-year window')
+    for count in (10, 100, resource_count):
+        ids = ','.join(str(r) for r in range(1, count + 1))
+        url = f'/slots?resource_ids={ids}&duration=60&start={BASE.isoformat()}&end={(BASE + timedelta(days=365)).isoformat()}&limit=10'
+        client.get(url)
+        runs = 5
+        started = time.perf_counter()
+        for _ in range(runs):
+            response = client.get(url)
+        elapsed = (time.perf_counter() - started) / runs
+        print(f'{count:>4} resources  {elapsed * 1000:7.1f} ms  first slot {response.get_json()["slots"][:1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Load test: seeds a synthetic dataset of configurable size and drives the main
+routes through Flask's test client, reporting p50/p99 latency, SQL queries per
+request and peak memory per scenario. Results are saved as JSON; pass
+--compare with an earlier results file to see the change per scenario.
+
+Query counts and memory come from the request instrumentation (instrumentation.py).
+
+Usage: python benchmarks/load_test.py [--events N] [--resources N] [--users N] [--density X]
+                                      [--requests N] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'load_test.db')
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
+os.environ['FLASK_SESSION_STORE_PATH'] = DB_PATH + '.sessions'
+os.environ['FLASK_RESPONSE_CACHE_PATH'] = DB_PATH + '.cache'
+os.environ['FLASK_INSTRUMENTATION_ENABLED'] = 'true'
+os.environ['FLASK_INSTRUMENTATION_LOG'] = 'false'
+# Every login comes from the test client's one address; the login rate limits aren't what is measured here
+os.environ['FLASK_LOGIN_RATE_LIMIT_PER_IP'] = '1000000'
+os.environ['FLASK_LOGIN_RATE_LIMIT_PER_USERNAME'] = '1000000'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, db, generate_synthetic_data  # noqa: E402
+
+WARMUP = 2
+MEMORY_SAMPLES = 5 # tracemalloc slows requests down, so memory is measured in a separate short pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def scenarios(args, rng):
+    today = datetime.now().date()
+    range_start = (today - timedelta(days=14)).isoformat()
+    range_end = (today + timedelta(days=14)).isoformat()
+
+    def login(client):
+        # A fresh client each time so the session never short-circuits the password check
+        fresh = app.test_client()
+        return fresh.post('/login', data={'username': f'user{rng.randint(1, args.users)}', 'password': 'password'})
+
+    return {
+        'login': login,
+        'events_first_page': lambda client: client.get('/events'),
+        'events_date_range': lambda client: client.get(f'/events?start_date={range_start}&end_date={range_end}'),
+        'allocate_page': lambda client: client.get('/allocate'),
+        'utilization_report': lambda client: client.get('/report/utilization'),
+        'utilization_report_range': lambda client: client.post(
+            '/report/utilization', data={'start_date': range_start, 'end_date': range_end}),
+    }
+
+
+def run_scenario(client, request_fn, requests):
+    for _ in range(WARMUP):
+        request_fn(client)
+    latencies, queries = [], []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = request_fn(client)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code < 400, response.status_code
+        queries.append(int(response.headers['X-Query-Count']))
+
+    tracemalloc.start()
+    peaks = [int(request_fn(client).headers['X-Peak-Memory']) for _ in range(MEMORY_SAMPLES)]
+    tracemalloc.stop()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'peak_memory_kb': max(peaks) // 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f'\nCompared with {baseline_path} (commit {baseline.get("commit")}):')
+    for name, current in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p99_ms', 'queries_per_request', 'peak_memory_kb'):
+            if before[key]:
+                changes.append(f'{key} {(current[key] - before[key]) / before[key]:+.0%}')
+        print(f'  {name:26} ' + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--resources', type=int, default=200)
+    parser.add_argument('--density', type=float, default=1.5, help='Average resources allocated per event')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=50, help='Measured requests per scenario')
+    parser.add_argument('--scenario', action='append', help='Run only these scenarios (repeatable)')
+    parser.add_argument('--output', help='Defaults to benchmarks/results/<timestamp>-<commit>.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = generate_synthetic_data(args.users, args.events, args.resources, args.density, args.days, seed=args.seed)
+        print(f'Seeded {counts} in {time.perf_counter() - started:.1f}s')
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': 'password'})
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'dataset': dict(counts, density=args.density, days=args.days, seed=args.seed),
+        'scenarios': {},
+    }
+    for name, request_fn in scenarios(args, rng).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        stats = run_scenario(client, request_fn, args.requests)
+        results['scenarios'][name] = stats
+        print(f'{name:26} p50 {stats["p50_ms"]:8.2f} ms  p99 {stats["p99_ms"]:8.2f} ms  '
+              f'{stats["queries_per_request"]:5.1f} queries  peak {stats["peak_memory_kb"]:7d} KB')
+    results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f'{datetime.now():%Y%m%d-%H%M%S}-{results["commit"] or "unknown"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output}')
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Fan-out of data change notifications as Server-Sent Events.
+
+Changes are rows of an append-only log with increasing ids, written in the same
+transaction as the change itself, so a client reconnecting with Last-Event-ID
+resumes exactly where it stopped. Broadcaster polls the log once for all of its
+subscribers and pushes new rows to a queue per subscriber; serve() is a small
+asyncio HTTP server streaming them to EventSource clients. An idle subscriber
+costs a coroutine and a queue rather than a thread.
+"""
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+HEARTBEAT = ': keepalive\n\n' # SSE comment; lets proxies and the server notice dead connections
+RETRY = 'retry: 2000\n\n' # Milliseconds before the browser reconnects
+
+
+def format_message(change_id, name, payload):
+    """One SSE message. payload is JSON text, which never contains a raw newline."""
+    return f'id: {change_id}\nevent: {name}\ndata: {payload}\n\n'
+
+
+def parse_after(value):
+    """Change id from a Last-Event-ID header or ?after= value, or None."""
+    return int(value) if value and value.strip().isdigit() else None
+
+
+class Subscriber:
+    __slots__ = ('queue', 'dropped')
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(queue_size) # Batches of (id, name, payload)
+        self.dropped = False
+
+
+class Broadcaster:
+    def __init__(self, fetch, last_id=0, poll_interval=0.5, queue_size=100):
+        # fetch(after_id) returns up to a page of (id, name, payload) rows in id order. It blocks
+        # on the database, so it runs on the loop's thread pool.
+        self.fetch = fetch
+        self.last_id = last_id
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    async def run(self):
+        """Polls the change log and publishes new rows to every subscriber, forever."""
+        loop = asyncio.get_running_loop()
+        while True:
+            changes = await loop.run_in_executor(None, self.fetch, self.last_id)
+            if changes:
+                self.last_id = changes[-1][0]
+                self.publish(changes)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    def publish(self, changes):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(changes)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream once it has drained the queue.
+                # The client reconnects with Last-Event-ID and catches up from the log.
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+
+    async def stream(self, after_id=None, heartbeat=15):
+        """
+        Yields SSE text: changes after after_id (or only new ones when None), then live
+        changes as they are published, with a heartbeat comment when idle.
+        """
+        subscriber = Subscriber(self.queue_size)
+        # Subscribe before reading the backlog so nothing published meanwhile is missed;
+        # rows seen in both are skipped by id
+        self._subscribers.add(subscriber)
+        try:
+            last_id = self.last_id if after_id is None else after_id
+            loop = asyncio.get_running_loop()
+            while last_id < self.last_id:
+                backlog = await loop.run_in_executor(None, self.fetch, last_id)
+                if not backlog:
+                    break
+                for change_id, name, payload in backlog:
+                    yield format_message(change_id, name, payload)
+                last_id = backlog[-1][0]
+
+            while not (subscriber.dropped and subscriber.queue.empty()):
+                try:
+                    changes = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                for change_id, name, payload in changes:
+                    if change_id > last_id:
+                        yield format_message(change_id, name, payload)
+                        last_id = change_id
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+async def serve(broadcaster, host, port, path='/changes', heartbeat=15, allowed_origin=None):
+    """
+    Serves GET path as an SSE stream from broadcaster until cancelled. Pages on another origin
+    can only read the stream when their origin is allowed_origin.
+    """
+    cors = f'Access-Control-Allow-Origin: {allowed_origin}\r\n'.encode() if allowed_origin else b''
+
+    async def handle(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1')
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            method, target, _ = request_line.split(' ', 2)
+            url = urlsplit(target)
+            if method != 'GET' or url.path != path:
+                writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                return
+            after_id = parse_after(headers.get('last-event-id') or parse_qs(url.query).get('after', [''])[0])
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n' +
+                         cors + b'Connection: keep-alive\r\n\r\n' + RETRY.encode())
+            async for message in broadcaster.stream(after_id, heartbeat):
+                writer.write(message.encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass # Client went away or sent a malformed request
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await asyncio.gather(server.serve_forever(), broadcaster.run())
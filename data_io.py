@@ -0,0 +1,71 @@
+"""
+Row readers and writers for bulk import/export in CSV or JSON Lines.
+
+Everything here works on iterators so files of any size are processed
+with bounded memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename, default='csv'):
+    """Picks the format from a file extension (.csv, .jsonl, .ndjson)."""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Yields (line_number, row) from a text stream. Rows are dicts;
+    a JSONL line that is not a JSON object yields None as the row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_rows(rows, columns, fmt, batch_size=1000):
+    """Yields text chunks for an iterable of tuples ordered like columns."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+    count = 0
+    for row in rows:
+        if writer:
+            writer.writerow([_plain(value) for value in row])
+        else:
+            buffer.write(json.dumps({column: _plain(value) for column, value in zip(columns, row)}))
+            buffer.write('\n')
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,117 @@
+"""
+Content-addressed storage for uploaded images.
+
+Uploads are streamed to disk in chunks while being hashed, so memory use does
+not depend on the file size and oversized files are rejected as soon as they
+pass the cap. Each image is stored as <sha256>.<ext>; identical uploads share
+one file. Thumbnails (<sha256>_<label>.<ext>) are made with Pillow when it is
+installed; without it the original is served at every size.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError: # Optional: only needed for thumbnails
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+STORED_NAME = re.compile(r'^[0-9a-f]{64}\.(png|jpg|gif)$')
+SERVED_NAME = re.compile(r'^[0-9a-f]{64}(_[a-z0-9]+)?\.(png|jpg|gif)$') # Originals and thumbnails
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def sniff_image_type(header):
+    """Returns the file extension for PNG, JPEG or GIF data, judged by its first bytes, else None."""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    return None
+
+
+def receive_stream(stream, directory, max_bytes):
+    """
+    Streams an uploaded image into a temporary file in directory while hashing it.
+    Returns (stored file name, temporary path); pass both to install(), or the path to discard().
+    Raises UploadTooLarge, or ValueError if it isn't a PNG, JPEG or GIF.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    header = b''
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                if len(header) < 16:
+                    header += chunk[:16 - len(header)]
+                digest.update(chunk)
+                output.write(chunk)
+        extension = sniff_image_type(header)
+        if extension is None:
+            raise ValueError('Not a PNG, JPEG or GIF image.')
+        return f'{digest.hexdigest()}.{extension}', temp_path
+    except BaseException:
+        discard(temp_path)
+        raise
+
+
+def install(temp_path, directory, name):
+    """
+    Moves a received image into place under name, or drops it if the same image is already stored.
+    Serialize it with remove_image(), so a shared file isn't removed just as another upload reuses it.
+    """
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        discard(temp_path)
+    else:
+        os.replace(temp_path, path)
+
+
+def discard(temp_path):
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def thumbnail_name(name, label):
+    stem, extension = name.rsplit('.', 1)
+    return f'{stem}_{label}.{extension}'
+
+
+def make_thumbnails(directory, name, sizes):
+    """Writes a thumbnail of the stored image for each {label: max_pixels} entry that doesn't exist yet."""
+    if Image is None:
+        return
+    with Image.open(os.path.join(directory, name)) as image:
+        for label, max_pixels in sizes.items():
+            path = os.path.join(directory, thumbnail_name(name, label))
+            if os.path.exists(path):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((max_pixels, max_pixels))
+            # Write under a temporary name so a half-written thumbnail is never served
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.thumb-')
+            with os.fdopen(fd, 'wb') as output:
+                thumbnail.save(output, format=image.format)
+            os.replace(temp_path, path)
+
+
+def remove_image(directory, name, sizes):
+    for file_name in [name] + [thumbnail_name(name, label) for label in sizes]:
+        try:
+            os.remove(os.path.join(directory, file_name))
+        except OSError:
+            pass
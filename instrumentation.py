@@ -0,0 +1,265 @@
+"""
+Opt-in per-request instrumentation.
+
+When INSTRUMENTATION_ENABLED is set, every request records wall time, SQL query
+count and cumulative SQL time (via SQLAlchemy engine events), template render
+time and optionally peak Python memory allocation (tracemalloc). Results are
+sent as Server-Timing/X-Query-Count response headers and log lines, and are
+aggregated into per-endpoint histograms served at /metrics in the Prometheus
+text format.
+
+With PROFILER_ENABLED, requests to PROFILER_ENDPOINTS are sampled by a
+background thread; when one takes longer than PROFILER_SLOW_MS its stacks are
+written in the collapsed ("folded") format read by flamegraph.pl and speedscope.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import sqlalchemy as sa
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+
+DEFAULTS = {
+    'INSTRUMENTATION_ENABLED': False,
+    'INSTRUMENTATION_HEADERS': True,
+    'INSTRUMENTATION_LOG': True,
+    'INSTRUMENTATION_TRACE_MEMORY': False, # tracemalloc slows every allocation down; enable only while investigating
+    'PROFILER_ENABLED': False,
+    'PROFILER_ENDPOINTS': ['resource_utilization_report', 'allocate_resource'],
+    'PROFILER_SLOW_MS': 500,
+    'PROFILER_INTERVAL_MS': 5,
+    'PROFILER_OUTPUT_DIR': None, # Defaults to <instance>/profiles
+}
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, name, labels):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class Metrics:
+    """Per-process metric registry, rendered in the Prometheus text exposition format."""
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Request wall time.', TIME_BUCKETS),
+        'db_queries_per_request': ('SQL statements executed per request.', COUNT_BUCKETS),
+        'db_query_duration_seconds': ('Cumulative SQL time per request.', TIME_BUCKETS),
+        'template_render_duration_seconds': ('Cumulative template render time per request.', TIME_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}      # (name, labels) -> Histogram
+        self._requests = Counter() # labels -> count
+
+    def record(self, endpoint, method, status, stats):
+        labels = f'endpoint="{endpoint}",method="{method}"'
+        values = {
+            'http_request_duration_seconds': stats.wall_time,
+            'db_queries_per_request': stats.query_count,
+            'db_query_duration_seconds': stats.sql_time,
+            'template_render_duration_seconds': stats.template_time,
+        }
+        with self._lock:
+            self._requests[f'{labels},status="{status}"'] += 1
+            for name, value in values.items():
+                key = (name, labels)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.HISTOGRAMS[name][1])
+                self._histograms[key].observe(value)
+
+    def render(self):
+        lines = ['# HELP http_requests_total Requests handled.', '# TYPE http_requests_total counter']
+        with self._lock:
+            lines += [f'http_requests_total{{{labels}}} {count}' for labels, count in sorted(self._requests.items())]
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (histogram_name, labels), histogram in sorted(self._histograms.items()):
+                    if histogram_name == name:
+                        lines += histogram.render(name, labels)
+        return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('started', 'wall_time', 'query_count', 'sql_time', 'template_time', 'peak_memory',
+                 '_query_started', '_template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_time = 0
+        self.query_count = 0
+        self.sql_time = 0
+        self.template_time = 0
+        self.peak_memory = None
+        self._query_started = None
+        self._template_started = None
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_folded(self, path):
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f'{stack} {count}\n')
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.metrics = Metrics()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+        if not app.config['INSTRUMENTATION_ENABLED'] and not app.config['PROFILER_ENABLED']:
+            return
+        self.app = app
+        if app.config['INSTRUMENTATION_LOG'] and app.logger.level == logging.NOTSET:
+            app.logger.setLevel(logging.INFO)
+        if app.config['INSTRUMENTATION_TRACE_MEMORY'] and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        # Statements run outside a request (CLI, startup) are ignored by the listeners
+        sa.event.listen(sa.engine.Engine, 'before_cursor_execute', self._before_cursor_execute)
+        sa.event.listen(sa.engine.Engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config['INSTRUMENTATION_ENABLED']:
+            app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    @staticmethod
+    def _stats():
+        return g.get('_request_stats') if has_request_context() else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is not None:
+            stats._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is not None and stats._query_started is not None:
+            stats.query_count += 1
+            stats.sql_time += time.perf_counter() - stats._query_started
+            stats._query_started = None
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None:
+            stats._template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = self._stats()
+        if stats is not None and stats._template_started is not None:
+            stats.template_time += time.perf_counter() - stats._template_started
+            stats._template_started = None
+
+    def _before_request(self):
+        config = self.app.config
+        g._request_stats = RequestStats()
+        if tracemalloc.is_tracing():
+            # Process-wide: with threaded servers the peak includes concurrent requests
+            tracemalloc.reset_peak()
+        if config['PROFILER_ENABLED'] and request.endpoint in config['PROFILER_ENDPOINTS']:
+            g._stack_sampler = StackSampler(threading.get_ident(), config['PROFILER_INTERVAL_MS'] / 1000)
+            g._stack_sampler.start()
+
+    def _after_request(self, response):
+        stats = self._stats()
+        if stats is None:
+            return response
+        stats.wall_time = time.perf_counter() - stats.started
+        if tracemalloc.is_tracing():
+            stats.peak_memory = tracemalloc.get_traced_memory()[1]
+
+        config = self.app.config
+        if config['INSTRUMENTATION_ENABLED']:
+            if config['INSTRUMENTATION_HEADERS']:
+                response.headers['Server-Timing'] = (
+                    f'app;dur={stats.wall_time * 1000:.1f}, '
+                    f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.query_count} queries", '
+                    f'tpl;dur={stats.template_time * 1000:.1f}'
+                )
+                response.headers['X-Query-Count'] = str(stats.query_count)
+                if stats.peak_memory is not None:
+                    response.headers['X-Peak-Memory'] = str(stats.peak_memory)
+            if config['INSTRUMENTATION_LOG']:
+                peak = f' peak={stats.peak_memory // 1024}KB' if stats.peak_memory is not None else ''
+                self.app.logger.info(
+                    f'{request.method} {request.path} {response.status_code} {stats.wall_time * 1000:.1f}ms '
+                    f'queries={stats.query_count} sql={stats.sql_time * 1000:.1f}ms '
+                    f'template={stats.template_time * 1000:.1f}ms{peak}'
+                )
+            if request.endpoint != 'metrics':
+                self.metrics.record(request.endpoint or 'unknown', request.method, response.status_code, stats)
+        return response
+
+    def _teardown_request(self, exc):
+        sampler = g.pop('_stack_sampler', None)
+        stats = self._stats()
+        if sampler is None:
+            return
+        sampler.stop()
+        elapsed_ms = (time.perf_counter() - stats.started) * 1000
+        if elapsed_ms >= self.app.config['PROFILER_SLOW_MS'] and sampler.stacks:
+            output_dir = self.app.config['PROFILER_OUTPUT_DIR'] or os.path.join(self.app.instance_path, 'profiles')
+            os.makedirs(output_dir, exist_ok=True)
+            filename = f'{request.endpoint}-{time.strftime("%Y%m%d-%H%M%S")}-{elapsed_ms:.0f}ms.folded'
+            sampler.write_folded(os.path.join(output_dir, filename))
+            self.app.logger.warning(f'Slow request {request.method} {request.path} ({elapsed_ms:.0f}ms); stacks written to {filename}')
+
+    def metrics_view(self):
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,315 @@
+"""
+Interval structures used for resource scheduling.
+
+Each resource gets its own interval tree (a treap keyed on (start, event_id)
+and augmented with the maximum end time of every subtree), so overlap queries
+cost O(log n + k) instead of a join-and-filter query against the database.
+Recurring events are kept per resource as series (see recurrence.py) and
+expanded only inside the queried window. find_free_slots sweeps merged busy
+intervals to find open time.
+"""
+import heapq
+import itertools
+import random
+import threading
+
+
+class _Node:
+    __slots__ = ('key', 'start', 'end', 'max_end', 'priority', 'left', 'right')
+
+    def __init__(self, start, end, event_id):
+        self.key = (start, event_id)
+        self.start = start
+        self.end = end
+        self.max_end = end
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+
+    def update(self):
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+def _split(node, key):
+    """Split a treap into (keys < key, keys >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        node.update()
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    node.update()
+    return left, node
+
+
+def _merge(left, right):
+    """Merge two treaps where every key in left is smaller than every key in right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _remove(node, key):
+    if node is None:
+        return None, False
+    if key == node.key:
+        return _merge(node.left, node.right), True
+    if key < node.key:
+        node.left, removed = _remove(node.left, key)
+    else:
+        node.right, removed = _remove(node.right, key)
+    if removed:
+        node.update()
+    return node, removed
+
+
+class IntervalTree:
+    """Half-open [start, end) intervals, each tagged with an event id."""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start, end, event_id):
+        node = _Node(start, end, event_id)
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+        self._size += 1
+
+    def remove(self, start, event_id):
+        self._root, removed = _remove(self._root, (start, event_id))
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlapping(self, start, end):
+        """Yield (start, end, event_id) for every interval overlapping [start, end)."""
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            # Nothing in this subtree ends after the query starts.
+            if node.max_end <= start:
+                continue
+            if node.left is not None:
+                stack.append(node.left)
+            if node.start < end:
+                if node.end > start:
+                    yield node.start, node.end, node.key[1]
+                # Right subtree starts no earlier than this node, so only
+                # descend while starts are still before the query end.
+                if node.right is not None:
+                    stack.append(node.right)
+
+
+    def overlapping_in_order(self, start, end):
+        """Lazily yield (start, end, event_id) for intervals overlapping [start, end), in start order."""
+        stack = []
+        node = self._root
+        while True:
+            # Walk left, skipping subtrees that end before the query starts
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start >= end:
+                return
+            if node.end > start:
+                yield node.start, node.end, node.key[1]
+            node = node.right
+
+
+def _tagged(occurrences, event_id):
+    for start, end in occurrences:
+        yield start, end, event_id
+
+
+class ResourceIntervalIndex:
+    """
+    Per-resource interval trees over allocated events.
+
+    The index tracks the time span (or recurrence series) of every event and
+    which resources each event is allocated to, so changing an event's times
+    moves it in every resource it belongs to. All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._trees = {}       # resource_id -> IntervalTree of one-off events
+        self._series = {}      # resource_id -> {event_id: Series} of recurring events
+        self._spans = {}       # event_id -> (start, end, series or None)
+        self._resources = {}   # event_id -> set of allocated resource_ids
+        self.loaded = False
+        self.change_id = 0     # Last change log entry reflected in the index, kept up by the caller
+
+    def load(self, event_spans, allocations):
+        """Rebuild from iterables of (event_id, start, end, series or None) and (event_id, resource_id)."""
+        with self._lock:
+            self._trees = {}
+            self._series = {}
+            self._spans = {span[0]: span[1:] for span in event_spans}
+            self._resources = {}
+            for event_id, resource_id in allocations:
+                self._add_allocation(event_id, resource_id)
+            self.loaded = True
+
+    def _attach(self, event_id, resource_id):
+        span = self._spans.get(event_id)
+        if span is None:
+            return
+        start, end, series = span
+        if series is not None:
+            self._series.setdefault(resource_id, {})[event_id] = series
+        else:
+            self._trees.setdefault(resource_id, IntervalTree()).insert(start, end, event_id)
+
+    def _detach(self, event_id, resource_id):
+        span = self._spans.get(event_id)
+        if span is None:
+            return
+        if span[2] is not None:
+            self._series.get(resource_id, {}).pop(event_id, None)
+        else:
+            self._trees[resource_id].remove(span[0], event_id)
+
+    def set_event(self, event_id, start, end, series=None):
+        with self._lock:
+            old = self._spans.get(event_id)
+            if old is not None and old[:2] == (start, end) and old[2] is series:
+                return
+            resource_ids = list(self._resources.get(event_id, ()))
+            for resource_id in resource_ids:
+                self._detach(event_id, resource_id)
+            self._spans[event_id] = (start, end, series)
+            for resource_id in resource_ids:
+                self._attach(event_id, resource_id)
+
+    def remove_event(self, event_id):
+        with self._lock:
+            for resource_id in self._resources.get(event_id, ()):
+                self._detach(event_id, resource_id)
+            self._spans.pop(event_id, None)
+            self._resources.pop(event_id, None)
+
+    def add_allocation(self, event_id, resource_id):
+        with self._lock:
+            self._add_allocation(event_id, resource_id)
+
+    def _add_allocation(self, event_id, resource_id):
+        # Adding an allocation twice is a no-op, so replaying a change already loaded is harmless
+        resource_ids = self._resources.setdefault(event_id, set())
+        if resource_id not in resource_ids:
+            resource_ids.add(resource_id)
+            self._attach(event_id, resource_id)
+
+    def remove_allocation(self, event_id, resource_id):
+        with self._lock:
+            resource_ids = self._resources.get(event_id)
+            if not resource_ids or resource_id not in resource_ids:
+                return
+            resource_ids.discard(resource_id)
+            self._detach(event_id, resource_id)
+
+    def overlapping(self, resource_id, start, end, exclude_event_id=None):
+        """Return ids of events on resource_id overlapping [start, end), ordered by start."""
+        return [event_id for _, _, event_id in self.overlapping_occurrences(resource_id, start, end, exclude_event_id)]
+
+    def overlapping_occurrences(self, resource_id, start, end, exclude_event_id=None):
+        """
+        Return (start, end, event_id) of bookings on resource_id overlapping [start, end), ordered
+        by start. For a recurring event that is its first occurrence overlapping the window.
+        """
+        with self._lock:
+            tree = self._trees.get(resource_id)
+            hits = list(tree.overlapping(start, end)) if tree else []
+            for event_id, series in self._series.get(resource_id, {}).items():
+                first = next(series.occurrences(start, end), None)
+                if first is not None:
+                    hits.append(first + (event_id,))
+        return [hit for hit in sorted(hits, key=lambda hit: (hit[0], hit[2])) if hit[2] != exclude_event_id]
+
+    def busy_intervals(self, resource_ids, start, end, exclude_event_id=None):
+        """
+        Lazily yield (start, end) of every booking on any of resource_ids overlapping [start, end),
+        merged into start order. The index stays locked until the generator is exhausted or closed.
+        """
+        with self._lock:
+            streams = [self._trees[resource_id].overlapping_in_order(start, end)
+                       for resource_id in resource_ids if resource_id in self._trees]
+            streams += [_tagged(series.occurrences(start, end), event_id)
+                        for resource_id in resource_ids
+                        for event_id, series in self._series.get(resource_id, {}).items()]
+            for hit_start, hit_end, event_id in heapq.merge(*streams):
+                if event_id != exclude_event_id:
+                    yield hit_start, hit_end
+
+    def conflicts(self, resource_ids, start, end, exclude_event_id=None):
+        """Check several resources at once; returns {resource_id: [event_id, ...]} for clashes only."""
+        result = {}
+        with self._lock:
+            for resource_id in resource_ids:
+                hits = self.overlapping(resource_id, start, end, exclude_event_id)
+                if hits:
+                    result[resource_id] = hits
+        return result
+
+
+def find_free_slots(busy, window_start, window_end, duration, limit, step=None):
+    """
+    Sweeps busy (start, end) intervals, sorted by start and possibly overlapping,
+    and returns up to limit free (start, end) slots of the given duration inside
+    [window_start, window_end). Within a free gap, candidate starts advance by step
+    (defaults to duration).
+    """
+    step = step or duration
+    cursor = window_start
+    slots = []
+    for start, end in itertools.chain(busy, [(window_end, window_end)]):
+        gap_end = min(start, window_end)
+        while cursor + duration <= gap_end:
+            slots.append((cursor, cursor + duration))
+            if len(slots) >= limit:
+                return slots
+            cursor += step
+        # Overlapping busy intervals merge here: the cursor only ever moves forward
+        if end > cursor:
+            cursor = end
+        if cursor >= window_end:
+            break
+    return slots
+
+
+def occupancy_bits(intervals, window_start, bucket, count):
+    """
+    Marks which of count buckets of length bucket, from window_start on, any (start, end)
+    interval overlaps. Returns an int whose bit i is set when bucket i is busy. Each interval
+    sets its whole run of bits with one shift and OR, so the cost grows with the number of
+    intervals rather than the number of buckets.
+    """
+    bits = 0
+    for start, end in intervals:
+        first = max(0, (start - window_start) // bucket)
+        last = min(count, -((window_start - end) // bucket)) # Rounded up, so a partly used bucket is busy
+        if last > first:
+            bits |= ((1 << (last - first)) - 1) << first
+    return bits
@@ -0,0 +1,173 @@
+"""
+Recurrence rules for repeating events, in a subset of iCalendar RRULE syntax:
+
+    FREQ=DAILY|WEEKLY|MONTHLY [;INTERVAL=n] [;BYDAY=MO,WE,...] [;COUNT=n | ;UNTIL=YYYYMMDD[THHMMSS]]
+
+BYDAY applies to weekly rules only. A series is stored once (its first
+occurrence plus the rule), and Series.occurrences() generates occurrences
+lazily inside a window. It jumps straight to the first candidate in the window,
+so the cost depends on the window rather than on how far the series runs.
+"""
+from datetime import datetime, time, timedelta
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+class RecurrenceRule:
+    __slots__ = ('freq', 'interval', 'byday', 'count', 'until')
+
+    def __init__(self, freq, interval=1, byday=None, count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday       # Sorted weekday numbers (Monday is 0), weekly rules only
+        self.count = count
+        self.until = until       # Last allowed occurrence start, inclusive
+
+    @classmethod
+    def parse(cls, text):
+        """Parses an RRULE string. Raises ValueError with a user-facing message."""
+        parts = {}
+        for part in text.strip().removeprefix('RRULE:').split(';'):
+            if not part.strip():
+                continue
+            name, sep, value = part.partition('=')
+            if not sep:
+                raise ValueError(f'Invalid recurrence rule part {part!r}; expected NAME=VALUE.')
+            parts[name.strip().upper()] = value.strip().upper()
+
+        unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL'}
+        if unknown:
+            raise ValueError(f'Unsupported recurrence rule parts: {", ".join(sorted(unknown))}.')
+        freq = parts.get('FREQ')
+        if freq not in FREQUENCIES:
+            raise ValueError('Recurrence rule needs FREQ=DAILY, WEEKLY or MONTHLY.')
+        try:
+            interval = int(parts.get('INTERVAL', 1))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+        except ValueError:
+            raise ValueError('INTERVAL and COUNT must be whole numbers.')
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError('INTERVAL and COUNT must be at least 1.')
+        if count is not None and 'UNTIL' in parts:
+            raise ValueError('Use either COUNT or UNTIL, not both.')
+        until = parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+
+        byday = None
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise ValueError('BYDAY is only supported with FREQ=WEEKLY.')
+            try:
+                byday = sorted({WEEKDAYS.index(day.strip()) for day in parts['BYDAY'].split(',')})
+            except ValueError:
+                raise ValueError('BYDAY must list days as MO, TU, WE, TH, FR, SA or SU.')
+        return cls(freq, interval, byday, count, until)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in self.byday))
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            parts.append(f'UNTIL={self.until:%Y%m%dT%H%M%S}')
+        return ';'.join(parts)
+
+
+def parse_until(value):
+    for fmt in ('%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            until = datetime.strptime(value.rstrip('Z'), fmt)
+        except ValueError:
+            continue
+        # A bare date includes occurrences starting at any time that day
+        return until if 'T' in value else datetime.combine(until.date(), time.max)
+    raise ValueError('UNTIL must be a date like 20250630 or 20250630T170000.')
+
+
+def add_months(moment, months):
+    month_index = moment.month - 1 + months
+    return moment.replace(year=moment.year + month_index // 12, month=month_index % 12 + 1)
+
+
+class Series:
+    """
+    The occurrences of an event whose first occurrence is [start, end) and which
+    repeats by rule. Occurrences are numbered by index; weekly rules count from
+    the Monday of the first week, so the first few indexes may fall before start.
+    """
+
+    def __init__(self, rule, start, end):
+        if isinstance(rule, str):
+            rule = RecurrenceRule.parse(rule)
+        self.rule = rule
+        self.start = start
+        self.duration = end - start
+        if rule.until is not None and rule.until < start:
+            raise ValueError('The recurrence UNTIL date is before the first occurrence.')
+
+        if rule.freq == 'MONTHLY':
+            if start.day > 28:
+                raise ValueError('Monthly events must start on or before the 28th of the month.')
+            self._first = 0
+            return
+        if rule.freq == 'DAILY':
+            self._base = start
+            self._offsets = [0]
+            self._period = timedelta(days=rule.interval)
+        else:
+            offsets = rule.byday or [start.weekday()]
+            if start.weekday() not in offsets:
+                raise ValueError('The first occurrence must fall on one of the BYDAY days.')
+            self._base = start - timedelta(days=start.weekday())
+            self._offsets = offsets
+            self._period = timedelta(weeks=rule.interval)
+        self._first = self._offsets.index(start.weekday() if rule.freq == 'WEEKLY' else 0)
+
+    def _start_of(self, index):
+        if self.rule.freq == 'MONTHLY':
+            return add_months(self.start, index * self.rule.interval)
+        period, slot = divmod(index, len(self._offsets))
+        return self._base + period * self._period + timedelta(days=self._offsets[slot])
+
+    def _first_index_from(self, moment):
+        """Smallest index >= the first occurrence whose start is at or after moment."""
+        if moment <= self.start:
+            return self._first
+        if self.rule.freq == 'MONTHLY':
+            months = (moment.year - self.start.year) * 12 + moment.month - self.start.month
+            index = max(0, months // self.rule.interval - 1)
+        else:
+            index = (moment - self._base) // self._period * len(self._offsets)
+        while self._start_of(index) < moment:
+            index += 1
+        return max(index, self._first)
+
+    def _in_series(self, index, start):
+        if self.rule.count is not None and index - self._first >= self.rule.count:
+            return False
+        return self.rule.until is None or start <= self.rule.until
+
+    def occurrences(self, window_start=None, window_end=None):
+        """Lazily yields (start, end) of every occurrence overlapping [window_start, window_end), in order."""
+        # Occurrences starting up to one duration before the window still reach into it
+        index = self._first_index_from(window_start - self.duration) if window_start else self._first
+        while True:
+            start = self._start_of(index)
+            if not self._in_series(index, start) or (window_end is not None and start >= window_end):
+                return
+            end = start + self.duration
+            if window_start is None or end > window_start:
+                yield start, end
+            index += 1
+
+    @property
+    def last_end(self):
+        """End of the final occurrence, or None if the series repeats forever."""
+        if self.rule.count is not None:
+            return self._start_of(self._first + self.rule.count - 1) + self.duration
+        if self.rule.until is not None:
+            return self._start_of(self._first_index_from(self.rule.until + timedelta(microseconds=1)) - 1) + self.duration
+        return None
@@ -0,0 +1,102 @@
+"""
+Storage for cached page responses.
+
+Entries are (etag, body, mimetype) tuples stored under a string key with a
+time to live. LRUCache keeps them in process memory; SQLiteCache keeps them in
+a SQLite file so several worker processes can share one cache.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-process cache holding at most max_entries items, evicting the least recently used."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Cache shared by every process using the same file. Reads never write, so
+    instead of strict LRU the table is trimmed to max_entries (soonest to
+    expire first) every prune_every writes, along with expired entries.
+    """
+
+    def __init__(self, path, max_entries=5000, prune_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache '
+                '(key TEXT PRIMARY KEY, etag TEXT NOT NULL, body BLOB NOT NULL, mimetype TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT etag, body, mimetype FROM response_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO response_cache (key, etag, body, mimetype, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (key, *value, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self.prune(connection, now)
+
+    def prune(self, connection, now):
+        connection.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,))
+        connection.execute(
+            'DELETE FROM response_cache WHERE key NOT IN '
+            '(SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT ?)', (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM response_cache')
@@ -0,0 +1,200 @@
+"""
+Server-side sessions.
+
+The session cookie holds only a random, signed session id; the data lives on
+the server in a SessionStore, so the cookie stays small however much the
+session holds. SQLiteSessionStore keeps sessions in one SQLite file and
+FileSessionStore keeps one file per session; both are shared by every worker
+process on the host. Data is serialized with Flask's tagged JSON, as the
+default cookie sessions are.
+"""
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+        super().__init__(initial, on_update)
+        self.sid = sid # None until the session is first stored
+        self.expires_at = expires_at
+        self.previous_sid = None
+        self.modified = False
+        self.accessed = False
+
+    # Reads mark the session as accessed so responses get "Vary: Cookie", as in Flask's own sessions
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def regenerate(self):
+        """Moves the data to a new session id. Call at login and logout so an id seen before is useless after."""
+        if self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class SQLiteSessionStore:
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            self._local.connection = connection
+        return connection
+
+    def get(self, sid):
+        """Returns (data, expires_at) for a live session, else None."""
+        row = self._connect().execute(
+            'SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, sid, data, expires_at):
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)', (sid, data, expires_at))
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+
+    def delete(self, sid):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+
+class FileSessionStore:
+    """One file per session, named by its id, holding the expiry time on the first line and the data after it."""
+
+    def __init__(self, directory, prune_every=1000):
+        self.directory = directory
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _read(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                expires_at, _, data = f.read().partition('\n')
+            return data, float(expires_at)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, sid):
+        stored = self._read(os.path.join(self.directory, sid))
+        return stored if stored and stored[1] > time.time() else None
+
+    def set(self, sid, data, expires_at):
+        # Write under a temporary name so a concurrent reader never sees a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.session-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f'{expires_at}\n{data}')
+        os.replace(temp_path, os.path.join(self.directory, sid))
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def delete(self, sid):
+        try:
+            os.remove(os.path.join(self.directory, sid))
+        except OSError:
+            pass
+
+    def prune(self):
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.'):
+                continue
+            stored = self._read(entry.path)
+            if stored is None or stored[1] <= now:
+                self.delete(entry.name)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='session-id')
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            stored = self.store.get(sid) if sid else None
+            if stored is not None:
+                data, expires_at = stored
+                return ServerSideSession(self.serializer.loads(data), sid, expires_at)
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        cookie_options = dict(
+            domain=self.get_cookie_domain(app), path=self.get_cookie_path(app), secure=self.get_cookie_secure(app),
+            partitioned=self.get_cookie_partitioned(app), samesite=self.get_cookie_samesite(app),
+            httponly=self.get_cookie_httponly(app)
+        )
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, **cookie_options)
+                response.vary.add('Cookie')
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Store on change, and push the expiry back once half the lifetime has passed
+        # rather than on every request, so reading a session costs no write
+        if session.sid is not None and not session.modified and session.expires_at - now > lifetime / 2:
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.set(session.sid, self.serializer.dumps(dict(session)), now + lifetime)
+        response.set_cookie(
+            name, self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session), **cookie_options
+        )
+        response.vary.add('Cookie')
@@ -0,0 +1,95 @@
+"""
+Load protection for expensive work.
+
+BoundedExecutor runs CPU-heavy calls (password hashing) on a small thread
+pool with a cap on queued work, so a burst of logins can only occupy a fixed
+number of cores and excess requests are turned away instead of piling up.
+RateLimiter is a sliding-window limiter keyed by any string (username, IP).
+retry() re-runs an operation that lost a race for a lock, backing off between attempts.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutorBusy(Exception):
+    """Raised when a BoundedExecutor already has its maximum amount of work queued."""
+
+
+class RetriesExhausted(Exception):
+    """Raised by retry() when every attempt failed with a retryable error."""
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers, max_pending):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hashing')
+        # Running plus queued calls; acquired without blocking so overflow fails fast
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def run(self, fn, *args, **kwargs):
+        """Runs fn on the pool and waits for its result. Raises ExecutorBusy when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class RateLimiter:
+    """Allows at most `limit` hits per key within any `window` seconds."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._hits = {} # key -> deque of hit times, oldest first
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key):
+        """Records a hit for key. Returns 0 if allowed, else the seconds until the next hit would be."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > self.window:
+                self._sweep(now)
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return max(1, int(hits[0] + self.window - now + 0.999))
+            hits.append(now)
+            return 0
+
+    def _sweep(self, now):
+        # Drop keys with no recent hits so memory stays proportional to active clients
+        for key in [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - self.window]:
+            del self._hits[key]
+        self._last_sweep = now
+
+
+def retry(fn, should_retry, attempts, base_delay, max_delay=1.0):
+    """
+    Calls fn() until it returns, at most attempts times. When it raises an error for which
+    should_retry(error) is true, waits a random time up to base_delay (doubling each attempt,
+    capped at max_delay) and tries again; the randomness keeps competing callers from retrying
+    in lockstep. Other errors propagate at once. Raises RetriesExhausted from the last error.
+    """
+    delay = base_delay
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if not should_retry(e):
+                raise
+            if attempt == attempts - 1:
+                raise RetriesExhausted() from e
+        time.sleep(random.uniform(0, delay))
+        delay = min(delay * 2, max_delay)